@@ -3,7 +3,7 @@ API REST con FastAPI para el sistema de gestión de documentos.
 """
 from fastapi import FastAPI, HTTPException, Query, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
@@ -26,7 +26,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Sistema de Gestión de Documentos - Guías de Remisión",
     description="API para procesar y consultar guías de remisión mediante OCR",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse  # Serialización JSON vía orjson (C)
 )
 
 # Configurar CORS
@@ -1,12 +1,16 @@
 """
 API endpoints para el módulo LDU
 """
-from fastapi import APIRouter, HTTPException, Query, BackgroundTasks, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, UploadFile, File, Form
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
+from operator import itemgetter
+import asyncio
+import sys
 import io
 import json
+import orjson
 import pandas as pd
 
 from services.ldu_sync_service import ldu_sync_service
@@ -16,6 +20,38 @@ from services.excel_drive_service import excel_drive_service
 router = APIRouter(prefix="/ldu", tags=["LDU"])
 
 
+def get_supabase():
+    """
+    Dependency de FastAPI que expone el cliente Supabase compartido.
+    Todos los workers reutilizan el mismo pool HTTP del singleton.
+    """
+    return ldu_sync_service.supabase
+
+
+# Valores repetidos en los eventos de historial: internados para que los miles
+# de dicts del payload compartan el mismo objeto str
+_TIPO_CAMBIO = sys.intern('cambio')
+_TIPO_REASIGNACION = sys.intern('reasignacion')
+_TIPO_CONFLICTO = sys.intern('conflicto')
+_ACCION_CAMBIO_RESPONSABLE = sys.intern('cambio_responsable')
+
+
+def _as_list(value: Any) -> list:
+    """
+    Normaliza un campo jsonb a lista.
+    Supabase puede devolver 'campos_editados_manualmente' como lista o como string JSON.
+    """
+    if isinstance(value, list):
+        return value
+    if not value:
+        return []
+    try:
+        parsed = orjson.loads(value)
+        return parsed if isinstance(parsed, list) else []
+    except Exception:
+        return []
+
+
 # ==================== MODELOS ====================
 
 class ImportRequest(BaseModel):
@@ -500,13 +536,8 @@ async def update_registro(imei: str, request: UpdateRegistroRequest):
         
         # Marcar campos como editados manualmente
         if edited_fields:
-            current_manual_fields = existing.get('campos_editados_manualmente', []) or []
-            if isinstance(current_manual_fields, str):
-                try:
-                    current_manual_fields = json.loads(current_manual_fields)
-                except:
-                    current_manual_fields = []
-            
+            current_manual_fields = _as_list(existing.get('campos_editados_manualmente'))
+
             # Agregar nuevos campos editados (sin duplicados)
             all_manual_fields = list(set(current_manual_fields + edited_fields))
             update_data['campos_editados_manualmente'] = all_manual_fields
@@ -899,13 +930,14 @@ async def get_conflictos(
     estado: str = Query(default="pendiente", description="Estado de los conflictos: pendiente, resuelto_mantener, resuelto_sobrescribir"),
     imei: Optional[str] = Query(default=None, description="Filtrar por IMEI específico"),
     page: int = Query(default=1, ge=1),
-    limit: int = Query(default=50, ge=1, le=200)
+    limit: int = Query(default=50, ge=1, le=200),
+    sb=Depends(get_supabase)
 ):
     """
     Obtiene lista de conflictos entre ediciones manuales y datos de Excel
     """
     try:
-        query = ldu_sync_service.supabase.table('ldu_conflictos').select(
+        query = sb.table('ldu_conflictos').select(
             '*, ldu_registros(modelo, responsable_nombre, responsable_apellido, punto_venta, region)'
         )
         
@@ -925,7 +957,7 @@ async def get_conflictos(
         result = query.execute()
         
         # Contar total
-        count_query = ldu_sync_service.supabase.table('ldu_conflictos').select('id', count='exact')
+        count_query = sb.table('ldu_conflictos').select('id', count='exact')
         if estado:
             count_query = count_query.eq('estado', estado)
         if imei:
@@ -944,28 +976,33 @@ async def get_conflictos(
 
 
 @router.get("/conflictos/resumen")
-async def get_conflictos_resumen():
+async def get_conflictos_resumen(sb=Depends(get_supabase)):
     """
     Obtiene resumen de conflictos pendientes
     """
     try:
         # Contar conflictos pendientes
-        pendientes = ldu_sync_service.supabase.table('ldu_conflictos').select(
+        pendientes = sb.table('ldu_conflictos').select(
             'id', count='exact'
         ).eq('estado', 'pendiente').execute()
         
-        # Contar por campo
-        campos = ldu_sync_service.supabase.table('ldu_conflictos').select(
-            'campo'
-        ).eq('estado', 'pendiente').execute()
-        
-        campos_conteo = {}
-        for c in campos.data:
-            campo = c.get('campo', 'unknown')
-            campos_conteo[campo] = campos_conteo.get(campo, 0) + 1
+        # Contar por campo (GROUP BY en el servidor vía RPC)
+        try:
+            campos = sb.rpc('ldu_conflictos_por_campo').execute()
+            campos_conteo = {r['campo']: r['n'] for r in campos.data}
+        except Exception:
+            # Fallback si la función RPC no está desplegada: agregar en Python
+            campos = sb.table('ldu_conflictos').select(
+                'campo'
+            ).eq('estado', 'pendiente').execute()
+
+            campos_conteo = {}
+            for c in campos.data:
+                campo = c.get('campo', 'unknown')
+                campos_conteo[campo] = campos_conteo.get(campo, 0) + 1
         
         # Obtener IMEIs únicos afectados
-        imeis = ldu_sync_service.supabase.table('ldu_conflictos').select(
+        imeis = sb.table('ldu_conflictos').select(
             'imei'
         ).eq('estado', 'pendiente').execute()
         
@@ -984,7 +1021,7 @@ async def get_conflictos_resumen():
 
 
 @router.post("/conflictos/{conflicto_id}/resolver")
-async def resolver_conflicto(conflicto_id: str, request: ResolveConflictRequest):
+async def resolver_conflicto(conflicto_id: str, request: ResolveConflictRequest, sb=Depends(get_supabase)):
     """
     Resuelve un conflicto individual.
     - 'mantener': Conserva el valor editado manualmente
@@ -992,7 +1029,7 @@ async def resolver_conflicto(conflicto_id: str, request: ResolveConflictRequest)
     """
     try:
         # Obtener conflicto
-        conflicto = ldu_sync_service.supabase.table('ldu_conflictos').select('*').eq(
+        conflicto = sb.table('ldu_conflictos').select('*').eq(
             'id', conflicto_id
         ).eq('estado', 'pendiente').execute()
         
@@ -1004,30 +1041,26 @@ async def resolver_conflicto(conflicto_id: str, request: ResolveConflictRequest)
         campo = c['campo']
         valor_excel = c['valor_excel']
         valor_actual = c['valor_actual']
-        
+        now_iso = datetime.now().isoformat()
+
         if request.accion == 'sobrescribir':
             # Aplicar valor del Excel
-            ldu_sync_service.supabase.table('ldu_registros').update({
+            sb.table('ldu_registros').update({
                 campo: valor_excel,
-                'fecha_actualizacion': datetime.now().isoformat()
+                'fecha_actualizacion': now_iso
             }).eq('imei', imei).execute()
             
             # Quitar campo de la lista de editados manualmente
-            registro = ldu_sync_service.supabase.table('ldu_registros').select(
+            registro = sb.table('ldu_registros').select(
                 'campos_editados_manualmente'
             ).eq('imei', imei).execute()
             
             if registro.data:
-                campos_manuales = registro.data[0].get('campos_editados_manualmente', []) or []
-                if isinstance(campos_manuales, str):
-                    try:
-                        campos_manuales = json.loads(campos_manuales)
-                    except:
-                        campos_manuales = []
-                
+                campos_manuales = _as_list(registro.data[0].get('campos_editados_manualmente'))
+
                 if campo in campos_manuales:
                     campos_manuales.remove(campo)
-                    ldu_sync_service.supabase.table('ldu_registros').update({
+                    sb.table('ldu_registros').update({
                         'campos_editados_manualmente': campos_manuales
                     }).eq('imei', imei).execute()
             
@@ -1039,10 +1072,10 @@ async def resolver_conflicto(conflicto_id: str, request: ResolveConflictRequest)
             estado_final = 'resuelto_mantener'
         
         # Actualizar conflicto
-        ldu_sync_service.supabase.table('ldu_conflictos').update({
+        sb.table('ldu_conflictos').update({
             'estado': estado_final,
             'resuelto_por': request.user,
-            'fecha_resolucion': datetime.now().isoformat(),
+            'fecha_resolucion': now_iso,
             'valor_final': valor_final
         }).eq('id', conflicto_id).execute()
         
@@ -1063,14 +1096,14 @@ async def resolver_conflicto(conflicto_id: str, request: ResolveConflictRequest)
 
 
 @router.post("/conflictos/resolver-todos")
-async def resolver_todos_conflictos(request: ResolveAllConflictsRequest):
+async def resolver_todos_conflictos(request: ResolveAllConflictsRequest, sb=Depends(get_supabase)):
     """
     Resuelve todos los conflictos pendientes con la misma acción.
     Opcionalmente puede filtrar por IMEI.
     """
     try:
         # Obtener conflictos pendientes
-        query = ldu_sync_service.supabase.table('ldu_conflictos').select('*').eq('estado', 'pendiente')
+        query = sb.table('ldu_conflictos').select('*').eq('estado', 'pendiente')
         
         if request.imei:
             query = query.eq('imei', request.imei)
@@ -1084,39 +1117,38 @@ async def resolver_todos_conflictos(request: ResolveAllConflictsRequest):
                 "resueltos": 0
             }
         
-        resueltos = 0
-        errores = 0
-        
-        for c in conflictos.data:
+        # Timestamp único para todo el lote
+        now_iso = datetime.now().isoformat()
+
+        # Resolver conflictos en paralelo (las llamadas a Supabase son bloqueantes,
+        # se ejecutan en hilos con concurrencia acotada)
+        semaforo = asyncio.Semaphore(10)
+
+        def _resolver_uno(c: Dict[str, Any]) -> bool:
             try:
                 imei = c['imei']
                 campo = c['campo']
                 valor_excel = c['valor_excel']
                 valor_actual = c['valor_actual']
-                
+
                 if request.accion == 'sobrescribir':
                     # Aplicar valor del Excel
-                    ldu_sync_service.supabase.table('ldu_registros').update({
+                    sb.table('ldu_registros').update({
                         campo: valor_excel,
-                        'fecha_actualizacion': datetime.now().isoformat()
+                        'fecha_actualizacion': now_iso
                     }).eq('imei', imei).execute()
                     
                     # Quitar campo de la lista de editados manualmente
-                    registro = ldu_sync_service.supabase.table('ldu_registros').select(
+                    registro = sb.table('ldu_registros').select(
                         'campos_editados_manualmente'
                     ).eq('imei', imei).execute()
                     
                     if registro.data:
-                        campos_manuales = registro.data[0].get('campos_editados_manualmente', []) or []
-                        if isinstance(campos_manuales, str):
-                            try:
-                                campos_manuales = json.loads(campos_manuales)
-                            except:
-                                campos_manuales = []
-                        
+                        campos_manuales = _as_list(registro.data[0].get('campos_editados_manualmente'))
+
                         if campo in campos_manuales:
                             campos_manuales.remove(campo)
-                            ldu_sync_service.supabase.table('ldu_registros').update({
+                            sb.table('ldu_registros').update({
                                 'campos_editados_manualmente': campos_manuales
                             }).eq('imei', imei).execute()
                     
@@ -1127,18 +1159,28 @@ async def resolver_todos_conflictos(request: ResolveAllConflictsRequest):
                     estado_final = 'resuelto_mantener'
                 
                 # Actualizar conflicto
-                ldu_sync_service.supabase.table('ldu_conflictos').update({
+                sb.table('ldu_conflictos').update({
                     'estado': estado_final,
                     'resuelto_por': request.user,
-                    'fecha_resolucion': datetime.now().isoformat(),
+                    'fecha_resolucion': now_iso,
                     'valor_final': valor_final
                 }).eq('id', c['id']).execute()
-                
-                resueltos += 1
+
+                return True
             except Exception as e:
                 print(f"Error resolviendo conflicto {c['id']}: {e}")
-                errores += 1
-        
+                return False
+
+        async def _resolver_con_limite(c: Dict[str, Any]) -> bool:
+            async with semaforo:
+                return await asyncio.to_thread(_resolver_uno, c)
+
+        resultados = await asyncio.gather(
+            *(_resolver_con_limite(c) for c in conflictos.data)
+        )
+        resueltos = sum(1 for ok in resultados if ok)
+        errores = len(resultados) - resueltos
+
         return {
             "success": True,
             "message": f"Resueltos {resueltos} conflictos" + (f" ({errores} errores)" if errores else ""),
@@ -1150,29 +1192,28 @@ async def resolver_todos_conflictos(request: ResolveAllConflictsRequest):
 
 
 @router.delete("/conflictos/{imei}/desproteger-campo")
-async def desproteger_campo(imei: str, campo: str = Query(..., description="Campo a desproteger")):
+async def desproteger_campo(
+    imei: str,
+    campo: str = Query(..., description="Campo a desproteger"),
+    sb=Depends(get_supabase)
+):
     """
     Quita un campo de la lista de 'editados manualmente', 
     permitiendo que sea actualizado en futuras importaciones.
     """
     try:
-        registro = ldu_sync_service.supabase.table('ldu_registros').select(
+        registro = sb.table('ldu_registros').select(
             'campos_editados_manualmente'
         ).eq('imei', imei).execute()
         
         if not registro.data:
             raise HTTPException(status_code=404, detail=f"Registro con IMEI {imei} no encontrado")
         
-        campos_manuales = registro.data[0].get('campos_editados_manualmente', []) or []
-        if isinstance(campos_manuales, str):
-            try:
-                campos_manuales = json.loads(campos_manuales)
-            except:
-                campos_manuales = []
-        
+        campos_manuales = _as_list(registro.data[0].get('campos_editados_manualmente'))
+
         if campo in campos_manuales:
             campos_manuales.remove(campo)
-            ldu_sync_service.supabase.table('ldu_registros').update({
+            sb.table('ldu_registros').update({
                 'campos_editados_manualmente': campos_manuales
             }).eq('imei', imei).execute()
             
@@ -1337,76 +1378,86 @@ async def export_ldu_excel(
 
 
 @router.get("/historial/{imei}")
-async def get_historial_completo(imei: str):
+async def get_historial_completo(imei: str, sb=Depends(get_supabase)):
     """
     Obtiene el historial completo de cambios de un registro LDU
     Incluye auditoría general, cambios de responsable y conflictos resueltos
     """
     try:
-        # Verificar que el IMEI existe
-        registro = ldu_sync_service.supabase.table('ldu_registros').select('*').eq('imei', imei).execute()
-        
+        # Lanzar las 4 consultas en paralelo (el cliente es bloqueante, van a hilos)
+        def _q_registro():
+            return sb.table('ldu_registros').select('*').eq(
+                'imei', imei
+            ).execute()
+
+        def _q_auditoria():
+            return sb.table('ldu_auditoria').select('*').eq(
+                'imei', imei
+            ).order('fecha_hora', desc=True).execute()
+
+        def _q_historial_resp():
+            return sb.table('ldu_historial_responsables').select('*').eq(
+                'ldu_imei', imei
+            ).order('fecha_cambio', desc=True).execute()
+
+        def _q_conflictos():
+            return sb.table('ldu_conflictos').select('*').eq(
+                'imei', imei
+            ).order('fecha_conflicto', desc=True).execute()
+
+        registro, auditoria, historial_resp, conflictos = await asyncio.gather(
+            asyncio.to_thread(_q_registro),
+            asyncio.to_thread(_q_auditoria),
+            asyncio.to_thread(_q_historial_resp),
+            asyncio.to_thread(_q_conflictos)
+        )
+
+        # Verificar que el IMEI existe (los otros resultados se descartan si no)
         if not registro.data:
             raise HTTPException(status_code=404, detail=f"IMEI {imei} no encontrado")
         
-        # Obtener auditoría general
-        auditoria = ldu_sync_service.supabase.table('ldu_auditoria').select('*').eq(
-            'imei', imei
-        ).order('fecha_hora', desc=True).execute()
-        
-        # Obtener historial de responsables
-        historial_resp = ldu_sync_service.supabase.table('ldu_historial_responsables').select('*').eq(
-            'ldu_imei', imei
-        ).order('fecha_cambio', desc=True).execute()
-        
-        # Obtener conflictos (pendientes y resueltos)
-        conflictos = ldu_sync_service.supabase.table('ldu_conflictos').select('*').eq(
-            'imei', imei
-        ).order('fecha_conflicto', desc=True).execute()
-        
-        # Combinar y ordenar todos los eventos cronológicamente
-        eventos = []
-        
-        for a in auditoria.data:
-            eventos.append({
-                'tipo': 'cambio',
-                'accion': a.get('accion'),
-                'fecha': a.get('fecha_hora'),
-                'usuario': a.get('usuario_sistema'),
-                'archivo': a.get('archivo_origen'),
-                'campos_previos': a.get('campos_previos'),
-                'campos_nuevos': a.get('campos_nuevos'),
-                'comentarios': a.get('comentarios')
-            })
-        
-        for h in historial_resp.data:
-            eventos.append({
-                'tipo': 'reasignacion',
-                'accion': 'cambio_responsable',
-                'fecha': h.get('fecha_cambio'),
-                'usuario': h.get('usuario_cambio'),
-                'responsable_anterior': f"{h.get('responsable_anterior_nombre', '')} (DNI: {h.get('responsable_anterior_dni', '')})",
-                'responsable_nuevo': f"{h.get('responsable_nuevo_nombre', '')} (DNI: {h.get('responsable_nuevo_dni', '')})",
-                'motivo': h.get('motivo'),
-                'comentarios': h.get('comentarios')
-            })
-        
-        for c in conflictos.data:
-            eventos.append({
-                'tipo': 'conflicto',
-                'accion': f"conflicto_{c.get('estado', 'pendiente')}",
-                'fecha': c.get('fecha_conflicto'),
-                'campo': c.get('campo'),
-                'valor_actual': c.get('valor_actual'),
-                'valor_excel': c.get('valor_excel'),
-                'estado': c.get('estado'),
-                'resuelto_por': c.get('resuelto_por'),
-                'fecha_resolucion': c.get('fecha_resolucion'),
-                'valor_final': c.get('valor_final')
-            })
-        
-        # Ordenar por fecha descendente
-        eventos.sort(key=lambda x: x.get('fecha', '') or '', reverse=True)
+        # Combinar todos los eventos (comprehensions evitan el .append por fila)
+        eventos_auditoria = [{
+            'tipo': _TIPO_CAMBIO,
+            'accion': a.get('accion'),
+            'fecha': a.get('fecha_hora') or '',
+            'usuario': a.get('usuario_sistema'),
+            'archivo': a.get('archivo_origen'),
+            'campos_previos': a.get('campos_previos'),
+            'campos_nuevos': a.get('campos_nuevos'),
+            'comentarios': a.get('comentarios')
+        } for a in auditoria.data]
+
+        eventos_resp = [{
+            'tipo': _TIPO_REASIGNACION,
+            'accion': _ACCION_CAMBIO_RESPONSABLE,
+            'fecha': h.get('fecha_cambio') or '',
+            'usuario': h.get('usuario_cambio'),
+            'responsable_anterior': f"{h.get('responsable_anterior_nombre', '')} (DNI: {h.get('responsable_anterior_dni', '')})",
+            'responsable_nuevo': f"{h.get('responsable_nuevo_nombre', '')} (DNI: {h.get('responsable_nuevo_dni', '')})",
+            'motivo': h.get('motivo'),
+            'comentarios': h.get('comentarios')
+        } for h in historial_resp.data]
+
+        eventos_conflictos = [{
+            'tipo': _TIPO_CONFLICTO,
+            'accion': f"conflicto_{c.get('estado', 'pendiente')}",
+            'fecha': c.get('fecha_conflicto') or '',
+            'campo': c.get('campo'),
+            'valor_actual': c.get('valor_actual'),
+            'valor_excel': c.get('valor_excel'),
+            'estado': c.get('estado'),
+            'resuelto_por': c.get('resuelto_por'),
+            'fecha_resolucion': c.get('fecha_resolucion'),
+            'valor_final': c.get('valor_final')
+        } for c in conflictos.data]
+
+        # Ordenar por fecha descendente (itemgetter evita el lambda por comparación)
+        eventos = sorted(
+            [*eventos_auditoria, *eventos_resp, *eventos_conflictos],
+            key=itemgetter('fecha'),
+            reverse=True
+        )
         
         return {
             "success": True,
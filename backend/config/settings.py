@@ -12,10 +12,21 @@ load_dotenv()
 
 # Rutas base
 BASE_DIR = Path(__file__).resolve().parent.parent
-TEMP_DIR = BASE_DIR / "temp"
 LOGS_DIR = BASE_DIR / "logs"
 
+# Estado persistente (sobrevive reinicios de la máquina)
+STATE_DIR = BASE_DIR / "temp"
+
+# Archivos temporales: tmpfs (/dev/shm) si está disponible, para que las
+# descargas transitorias (TIFs) no pasen por disco
+_shm = Path("/dev/shm")
+if _shm.is_dir() and os.access(_shm, os.W_OK):
+    TEMP_DIR = _shm / "guia"
+else:
+    TEMP_DIR = STATE_DIR
+
 # Crear directorios si no existen
+STATE_DIR.mkdir(exist_ok=True)
 TEMP_DIR.mkdir(exist_ok=True)
 LOGS_DIR.mkdir(exist_ok=True)
 
@@ -33,22 +44,33 @@ GOOGLE_TOKEN_JSON = os.getenv("GOOGLE_TOKEN_JSON", "")
 # Determinar el modo de autenticación
 USE_SERVICE_ACCOUNT = bool(GOOGLE_SERVICE_ACCOUNT_JSON)
 
+
+def _write_if_changed(path: Path, content: str) -> None:
+    """Escribe el archivo solo si no existe o su contenido cambió (evita I/O por arranque)."""
+    try:
+        if path.read_text() == content:
+            return
+    except OSError:
+        pass
+    path.write_text(content)
+
+
 if GOOGLE_SERVICE_ACCOUNT_JSON:
     # Service Account (producción)
     sa_path = Path(tempfile.gettempdir()) / "google_service_account.json"
-    sa_path.write_text(GOOGLE_SERVICE_ACCOUNT_JSON)
+    _write_if_changed(sa_path, GOOGLE_SERVICE_ACCOUNT_JSON)
     GOOGLE_SERVICE_ACCOUNT_FILE = str(sa_path)
     GOOGLE_CREDENTIALS_FILE = None
     GOOGLE_TOKEN_FILE = None
 elif GOOGLE_CREDENTIALS_JSON:
     # OAuth desde variable de entorno
     creds_path = Path(tempfile.gettempdir()) / "google_credentials.json"
-    creds_path.write_text(GOOGLE_CREDENTIALS_JSON)
+    _write_if_changed(creds_path, GOOGLE_CREDENTIALS_JSON)
     GOOGLE_CREDENTIALS_FILE = str(creds_path)
-    
+
     if GOOGLE_TOKEN_JSON:
         token_path = Path(tempfile.gettempdir()) / "google_token.json"
-        token_path.write_text(GOOGLE_TOKEN_JSON)
+        _write_if_changed(token_path, GOOGLE_TOKEN_JSON)
         GOOGLE_TOKEN_FILE = str(token_path)
     else:
         GOOGLE_TOKEN_FILE = os.getenv("GOOGLE_TOKEN_FILE", "token.json")
@@ -65,12 +87,16 @@ SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
 SUPABASE_TABLE = os.getenv("SUPABASE_TABLE", "documentos_guia")
 
+# Connection string directo a Postgres (opcional): habilita el pool
+# asyncpg para las escrituras masivas, saltándose PostgREST
+SUPABASE_DB_URL = os.getenv("SUPABASE_DB_URL", "")
+
 # OCR Configuration
-OCR_LANGUAGES = ["es", "en"]
+OCR_LANGUAGES = ["es", "en"]  # EasyOCR requiere lista
 OCR_GPU = os.getenv("OCR_GPU", "False").lower() == "true"
 
-# Campos a extraer del documento
-CAMPOS_DOCUMENTO = [
+# Campos a extraer del documento (orden de extracción)
+CAMPOS_DOCUMENTO = (
     "numero_guia",
     "fecha_documento",
     "proveedor",
@@ -88,13 +114,16 @@ CAMPOS_DOCUMENTO = [
     "ruc",
     "direccion_remitente",
     "placa"
-]
+)
 
-# Dummy phones conocidos para detección
-DUMMY_PHONES = [
-    "V60 Lite", "Y21D", "Y35", "Y55", "Y22s", "Y16", 
+# Conjunto para membership O(1) (ej: "campo" in CAMPOS_DOCUMENTO_SET)
+CAMPOS_DOCUMENTO_SET = frozenset(CAMPOS_DOCUMENTO)
+
+# Dummy phones conocidos para detección: frozenset para membership O(1)
+DUMMY_PHONES = frozenset({
+    "V60 Lite", "Y21D", "Y35", "Y55", "Y22s", "Y16",
     "Y02s", "Y02t", "T1", "T2x", "X90", "X80"
-]
+})
 
 # API Configuration
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
@@ -102,3 +131,6 @@ API_PORT = int(os.getenv("API_PORT", "8000"))
 
 # Polling interval (segundos)
 DRIVE_POLLING_INTERVAL = int(os.getenv("DRIVE_POLLING_INTERVAL", "60"))
+
+# Descargas de Drive en paralelo (acotado por cuota por usuario)
+DRIVE_DOWNLOAD_WORKERS = int(os.getenv("DRIVE_DOWNLOAD_WORKERS", "8"))
@@ -0,0 +1,17 @@
+-- =====================================================
+-- MIGRACIÓN: Agregación de conflictos por campo en el servidor
+-- Ejecutar en Supabase SQL Editor
+-- =====================================================
+
+-- Índice para que el GROUP BY use index-only scan sobre conflictos pendientes
+CREATE INDEX IF NOT EXISTS idx_ldu_conflictos_estado_campo
+ON ldu_conflictos(estado, campo);
+
+-- Función RPC: cuenta conflictos pendientes agrupados por campo
+CREATE OR REPLACE FUNCTION ldu_conflictos_por_campo()
+RETURNS TABLE(campo VARCHAR, n BIGINT) AS $$
+    SELECT campo, COUNT(*) AS n
+    FROM ldu_conflictos
+    WHERE estado = 'pendiente'
+    GROUP BY campo;
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,13 @@
+-- =====================================================
+-- MIGRACIÓN: Índice parcial para conflictos pendientes
+-- Ejecutar en Supabase SQL Editor
+-- =====================================================
+
+-- Los endpoints de conflictos siempre filtran estado='pendiente' y luego
+-- opcionalmente por imei/campo. Un índice parcial cubre ese hot path con
+-- index-only scans y se mantiene pequeño (los pendientes son una fracción
+-- de la tabla).
+CREATE INDEX IF NOT EXISTS idx_ldu_conflictos_pendientes
+ON ldu_conflictos (imei, campo)
+INCLUDE (id, valor_actual, valor_excel)
+WHERE estado = 'pendiente';
@@ -0,0 +1,12 @@
+-- =====================================================
+-- MIGRACIÓN: Hash de contenido para detección de cambios
+-- Ejecutar en Supabase SQL Editor
+-- =====================================================
+
+-- La sincronización guarda un hash estable de los campos comparables de
+-- cada registro; en importaciones posteriores basta comparar hashes en
+-- lugar de los ~21 campos uno a uno. Las filas sin hash (anteriores a
+-- esta migración o editadas manualmente) siguen por la comparación campo
+-- a campo y reciben su hash en la próxima actualización.
+ALTER TABLE ldu_registros
+ADD COLUMN IF NOT EXISTS content_hash TEXT;
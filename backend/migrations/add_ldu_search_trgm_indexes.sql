@@ -0,0 +1,35 @@
+-- =====================================================
+-- MIGRACIÓN: Índices trigram para la búsqueda LDU
+-- Ejecutar en Supabase SQL Editor
+-- =====================================================
+
+-- search_ldu filtra con ILIKE '%...%' (wildcard inicial), que un b-tree
+-- no puede indexar: cada búsqueda era un seq-scan de ldu_registros.
+-- Los índices GIN con gin_trgm_ops cubren exactamente esos predicados
+-- sin cambiar la semántica de subcadena (búsquedas parciales de IMEI o
+-- DNI siguen funcionando igual), a diferencia de un tsvector que solo
+-- matchea lexemas completos.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Columnas del OR de búsqueda general
+CREATE INDEX IF NOT EXISTS idx_ldu_registros_imei_trgm
+ON ldu_registros USING GIN (imei gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_ldu_registros_modelo_trgm
+ON ldu_registros USING GIN (modelo gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_ldu_registros_resp_nombre_trgm
+ON ldu_registros USING GIN (responsable_nombre gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_ldu_registros_resp_apellido_trgm
+ON ldu_registros USING GIN (responsable_apellido gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_ldu_registros_resp_dni_trgm
+ON ldu_registros USING GIN (responsable_dni gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_ldu_registros_punto_venta_trgm
+ON ldu_registros USING GIN (punto_venta gin_trgm_ops);
+
+-- Filtros por columna individual
+CREATE INDEX IF NOT EXISTS idx_ldu_registros_region_trgm
+ON ldu_registros USING GIN (region gin_trgm_ops);
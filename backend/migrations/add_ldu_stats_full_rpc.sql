@@ -0,0 +1,24 @@
+-- =====================================================
+-- MIGRACIÓN: RPC de estadísticas LDU en una sola consulta
+-- Ejecutar en Supabase SQL Editor
+-- =====================================================
+
+-- get_stats hacía tres COUNT(*) separados (total, sin responsable,
+-- ausentes) sobre la misma tabla: tres round-trips y tres scans. Esta
+-- función devuelve los tres contadores en un jsonb con una sola pasada
+-- usando agregados con FILTER.
+CREATE OR REPLACE FUNCTION ldu_stats_full()
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT jsonb_build_object(
+        'total',
+        count(*) FILTER (WHERE activo),
+        'sin_responsable',
+        count(*) FILTER (WHERE activo AND responsable_dni IS NULL),
+        'ausentes_ultimo_excel',
+        count(*) FILTER (WHERE activo AND NOT presente_en_ultima_importacion)
+    )
+    FROM ldu_registros;
+$$;
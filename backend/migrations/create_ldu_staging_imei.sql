@@ -0,0 +1,13 @@
+-- =====================================================
+-- MIGRACIÓN: Tabla staging para el diff de IMEIs ausentes
+-- Ejecutar en Supabase SQL Editor
+-- =====================================================
+
+-- La sincronización copia los IMEIs del Excel actual aquí (COPY vía
+-- asyncpg) y un solo UPDATE ... NOT EXISTS marca los ausentes en el
+-- servidor, en lugar de bajar todos los IMEIs activos a Python para
+-- hacer la diferencia del lado del cliente. UNLOGGED: el contenido es
+-- transitorio por importación, no necesita WAL.
+CREATE UNLOGGED TABLE IF NOT EXISTS ldu_staging_imei (
+    imei TEXT PRIMARY KEY
+);
@@ -5,19 +5,25 @@ Soporta tanto OAuth (desarrollo) como Service Account (producción).
 """
 import os
 import io
+import json
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import List, Dict, Optional, Callable
 from datetime import datetime
 
+import httplib2
+import google_auth_httplib2
+
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google.oauth2 import service_account
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
+from googleapiclient.http import HttpRequest, MediaIoBaseDownload
 from googleapiclient.errors import HttpError
+from googleapiclient.model import JsonModel
 
 from config.settings import (
     GOOGLE_DRIVE_FOLDER_ID,
@@ -26,19 +32,74 @@ from config.settings import (
     GOOGLE_SERVICE_ACCOUNT_FILE,
     USE_SERVICE_ACCOUNT,
     TEMP_DIR,
-    DRIVE_POLLING_INTERVAL
+    STATE_DIR,
+    DRIVE_POLLING_INTERVAL,
+    DRIVE_DOWNLOAD_WORKERS
 )
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Archivo donde se persisten los IDs ya procesados (sobrevive reinicios)
+PROCESSED_FILES_PATH = STATE_DIR / "processed_files.json"
+
+# Cada cuántos archivos procesados se vuelca el set a disco
+PROCESSED_PERSIST_EVERY = 20
+
+# Tope del backoff de polling cuando la carpeta está inactiva (segundos)
+MONITOR_MAX_INTERVAL = 300
+
+# Chunk de descarga: 8 MB (el default de 100 KB multiplica los round-trips)
+DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Tiempo de vida del cache de listados por carpeta (segundos)
+LIST_CACHE_TTL = 30
+
+
+class _OrjsonModel(JsonModel):
+    """JsonModel que deserializa las respuestas de Drive con orjson.
+
+    El parser C es 2-5x más rápido que el json stdlib, lo que se nota en
+    listados paginados de carpetas grandes.
+    """
+
+    def deserialize(self, content):
+        try:
+            if isinstance(content, str):
+                content = content.encode('utf-8')
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return super().deserialize(content)
+        if isinstance(body, dict) and self._data_wrapper and 'data' in body:
+            body = body['data']
+        return body
+
+
+try:
+    import orjson
+    _response_model = _OrjsonModel()
+except ImportError:
+    _response_model = None
+
 # Scopes necesarios para Google Drive y Sheets
 SCOPES = [
     'https://www.googleapis.com/auth/drive',  # Acceso completo a Drive (lectura/escritura)
     'https://www.googleapis.com/auth/spreadsheets'  # Acceso a Google Sheets
 ]
 
+def gzip_request_builder(http, postproc, uri, method='GET', body=None,
+                         headers=None, methodId=None, resumable=None):
+    """
+    Request builder que habilita gzip en todas las respuestas de la API.
+    Google solo comprime si el User-Agent contiene 'gzip'.
+    """
+    headers = dict(headers or {})
+    headers['accept-encoding'] = 'gzip'
+    headers['user-agent'] = 'guia-backend (gzip)'
+    return HttpRequest(http, postproc, uri, method=method, body=body,
+                       headers=headers, methodId=methodId, resumable=resumable)
+
 
 class GoogleDriveService:
     """Servicio para interactuar con Google Drive."""
@@ -47,7 +108,25 @@ class GoogleDriveService:
         self.creds = None
         self.service = None
         self.folder_id = GOOGLE_DRIVE_FOLDER_ID
-        self.processed_files: set = set()
+        self.processed_files: set = self._load_processed_files()
+        self._unpersisted_adds = 0
+        # Query y proyección del listado, construidas una sola vez
+        self._list_query_tpl = (
+            "'{}' in parents and (mimeType='image/tiff' "
+            "or name contains '.tif') and trashed=false"
+        )
+        self._list_fields = 'nextPageToken, files(id, name, createdTime, modifiedTime, webViewLink)'
+        # Cache de listados por carpeta: folder_id -> (timestamp, archivos)
+        self._list_cache: Dict[str, tuple] = {}
+        self._changes_page_token: Optional[str] = None
+        # Pendiente un listado completo inicial antes de usar solo deltas
+        self._catchup_pending = True
+        # IDs descargándose o en cola de OCR: se excluyen del polling para
+        # no reprocesar un archivo cuyo callback aún no terminó
+        self._in_flight: set = set()
+        self._download_executor: Optional[ThreadPoolExecutor] = None
+        self._process_executor: Optional[ThreadPoolExecutor] = None
+        self._http: Optional[google_auth_httplib2.AuthorizedHttp] = None
         
     def authenticate(self) -> bool:
         """
@@ -62,7 +141,11 @@ class GoogleDriveService:
                     GOOGLE_SERVICE_ACCOUNT_FILE,
                     scopes=SCOPES
                 )
-                self.service = build('drive', 'v3', credentials=self.creds)
+                self._http = self._build_http()
+                self.service = build('drive', 'v3', http=self._http,
+                                     requestBuilder=gzip_request_builder,
+                                     model=_response_model)
+                self._init_changes_token()
                 logger.info("Autenticación con Service Account exitosa.")
                 return True
             
@@ -95,7 +178,11 @@ class GoogleDriveService:
                     logger.info("Token guardado exitosamente.")
             
             # Construir servicio
-            self.service = build('drive', 'v3', credentials=self.creds)
+            self._http = self._build_http()
+            self.service = build('drive', 'v3', http=self._http,
+                                 requestBuilder=gzip_request_builder,
+                                 model=_response_model)
+            self._init_changes_token()
             logger.info("Autenticación con Google Drive exitosa.")
             return True
             
@@ -112,17 +199,26 @@ class GoogleDriveService:
             return []
         
         folder_id = folder_id or self.folder_id
+
+        # Drive v3 no expone ETags en files().list, así que no hay 304
+        # condicional posible; un cache corto evita repetir el listado
+        # completo cuando varios llamadores lo piden en la misma ventana.
+        cached = self._list_cache.get(folder_id)
+        if cached and time.time() - cached[0] < LIST_CACHE_TTL:
+            return cached[1]
+
         files = []
         
         try:
-            query = f"'{folder_id}' in parents and (mimeType='image/tiff' or name contains '.tif') and trashed=false"
+            query = self._list_query_tpl.format(folder_id)
             
             page_token = None
             while True:
                 results = self.service.files().list(
                     q=query,
                     spaces='drive',
-                    fields='nextPageToken, files(id, name, createdTime, modifiedTime, webViewLink, webContentLink, size)',
+                    fields=self._list_fields,
+                    pageSize=1000,
                     pageToken=page_token
                 ).execute()
                 
@@ -133,6 +229,7 @@ class GoogleDriveService:
                     break
             
             logger.info(f"Se encontraron {len(files)} archivos TIF.")
+            self._list_cache[folder_id] = (time.time(), files)
             return files
             
         except HttpError as e:
@@ -149,18 +246,21 @@ class GoogleDriveService:
         
         try:
             request = self.service.files().get_media(fileId=file_id)
-            
+            # http propio por descarga: httplib2 no es thread-safe y las
+            # descargas pueden correr en paralelo desde monitor_folder
+            request.http = google_auth_httplib2.AuthorizedHttp(
+                self.creds, http=httplib2.Http()
+            )
+
             # Crear ruta de destino
             dest_path = TEMP_DIR / file_name
-            
+
             fh = io.FileIO(dest_path, 'wb')
-            downloader = MediaIoBaseDownload(fh, request)
+            downloader = MediaIoBaseDownload(fh, request, chunksize=DOWNLOAD_CHUNK_SIZE)
             
             done = False
             while not done:
                 status, done = downloader.next_chunk()
-                if status:
-                    logger.info(f"Descarga {file_name}: {int(status.progress() * 100)}%")
             
             fh.close()
             logger.info(f"Archivo descargado: {dest_path}")
@@ -203,7 +303,7 @@ class GoogleDriveService:
             request = self.service.files().get_media(fileId=file_id)
             
             fh = io.BytesIO()
-            downloader = MediaIoBaseDownload(fh, request)
+            downloader = MediaIoBaseDownload(fh, request, chunksize=DOWNLOAD_CHUNK_SIZE)
             
             done = False
             while not done:
@@ -236,19 +336,176 @@ class GoogleDriveService:
             logger.error(f"Error al obtener info del archivo {file_id}: {str(e)}")
             return None
     
+    def _build_http(self) -> google_auth_httplib2.AuthorizedHttp:
+        """
+        Transporte HTTP autorizado compartido por el servicio.
+        Un único httplib2.Http reutiliza las conexiones TCP/TLS entre
+        llamadas consecutivas (list/get del polling) en lugar de abrir
+        un socket por request.
+        """
+        return google_auth_httplib2.AuthorizedHttp(
+            self.creds, http=httplib2.Http(timeout=60)
+        )
+
+    def _init_changes_token(self):
+        """Obtiene el token inicial de la API de cambios para polling incremental."""
+        try:
+            token = self.service.changes().getStartPageToken().execute()
+            self._changes_page_token = token.get('startPageToken')
+        except Exception as e:
+            logger.warning(f"No se pudo obtener startPageToken, se usará listado completo: {e}")
+            self._changes_page_token = None
+
+    def _list_changed_tif_files(self) -> Optional[List[Dict]]:
+        """
+        Lista solo los TIF que cambiaron desde el último poll (API changes).
+        Retorna None si la consulta de cambios falla.
+        """
+        try:
+            files = []
+            page_token = self._changes_page_token
+
+            while page_token:
+                resp = self.service.changes().list(
+                    pageToken=page_token,
+                    spaces='drive',
+                    fields='nextPageToken, newStartPageToken, '
+                           'changes(fileId, removed, file(id, name, mimeType, parents, '
+                           'createdTime, modifiedTime, webViewLink, trashed))'
+                ).execute()
+
+                for change in resp.get('changes', []):
+                    f = change.get('file')
+                    if not f or change.get('removed') or f.get('trashed'):
+                        continue
+                    if self.folder_id not in (f.get('parents') or []):
+                        continue
+                    name = f.get('name', '')
+                    if f.get('mimeType') != 'image/tiff' and '.tif' not in name.lower():
+                        continue
+                    files.append(f)
+
+                if 'newStartPageToken' in resp:
+                    self._changes_page_token = resp['newStartPageToken']
+                page_token = resp.get('nextPageToken')
+
+            return files
+
+        except HttpError as e:
+            logger.error(f"Error al listar cambios: {str(e)}")
+            return None
+
+    def _get_download_executor(self) -> ThreadPoolExecutor:
+        """Pool de hilos compartido para descargas paralelas."""
+        if self._download_executor is None:
+            self._download_executor = ThreadPoolExecutor(
+                max_workers=DRIVE_DOWNLOAD_WORKERS
+            )
+        return self._download_executor
+
+    def _get_process_executor(self) -> ThreadPoolExecutor:
+        """Hilo dedicado al procesamiento (OCR): serializa los callbacks
+        sin bloquear el loop de polling/descargas."""
+        if self._process_executor is None:
+            self._process_executor = ThreadPoolExecutor(max_workers=1)
+        return self._process_executor
+
+    def _run_callback(self, callback: Callable, file_info: Dict, local_path: Path):
+        """Ejecuta el callback de un archivo descargado y limpia el temporal."""
+        try:
+            callback(file_info, local_path)
+            self.mark_as_processed(file_info['id'])
+        except Exception as e:
+            logger.error(f"Error procesando {file_info['name']}: {str(e)}")
+        finally:
+            self._in_flight.discard(file_info['id'])
+            if local_path.exists():
+                local_path.unlink()
+
+    def download_files(self, files: List[Dict]) -> List[tuple]:
+        """
+        Descarga varios archivos en paralelo.
+
+        Args:
+            files: Lista de dicts con 'id' y 'name'.
+
+        Returns:
+            Lista de tuplas (file_info, local_path o None) en orden de término.
+        """
+        executor = self._get_download_executor()
+        futures = {
+            executor.submit(self.download_file, f['id'], f['name']): f
+            for f in files
+        }
+
+        results = []
+        for future in as_completed(futures):
+            file_info = futures[future]
+            try:
+                local_path = future.result()
+            except Exception as e:
+                logger.error(f"Error descargando {file_info['name']}: {str(e)}")
+                local_path = None
+            results.append((file_info, local_path))
+
+        return results
+
     def get_new_files(self) -> List[Dict]:
         """
         Obtiene archivos nuevos que aún no han sido procesados.
+        Usa la API de cambios (solo deltas) cuando hay token; si no está
+        disponible cae al listado completo de la carpeta.
         """
+        if self._catchup_pending:
+            # Primer poll tras el arranque: listado completo para recoger
+            # lo subido mientras el proceso estaba caído — el token de
+            # cambios parte de "ahora" y nunca vería ese backlog
+            self._catchup_pending = False
+            all_files = self.list_tif_files()
+            return self._filter_pending(all_files)
+
+        if self._changes_page_token:
+            changed = self._list_changed_tif_files()
+            if changed is not None:
+                return self._filter_pending(changed)
+
         all_files = self.list_tif_files()
-        new_files = [f for f in all_files if f['id'] not in self.processed_files]
-        return new_files
+        return self._filter_pending(all_files)
+
+    def _filter_pending(self, files: List[Dict]) -> List[Dict]:
+        """Descarta archivos ya procesados o actualmente en vuelo."""
+        processed = self.processed_files
+        in_flight = self._in_flight
+        return [
+            f for f in files
+            if f['id'] not in processed and f['id'] not in in_flight
+        ]
     
+    def _load_processed_files(self) -> set:
+        """Carga los IDs procesados desde disco para no reprocesar tras un reinicio."""
+        try:
+            with open(PROCESSED_FILES_PATH) as fh:
+                return set(json.load(fh))
+        except (OSError, ValueError):
+            return set()
+
+    def _persist_processed_files(self):
+        """Vuelca el set de procesados a disco."""
+        try:
+            with open(PROCESSED_FILES_PATH, 'w') as fh:
+                json.dump(sorted(self.processed_files), fh)
+            self._unpersisted_adds = 0
+        except OSError as e:
+            logger.warning(f"No se pudo persistir processed_files: {e}")
+
     def mark_as_processed(self, file_id: str):
         """
-        Marca un archivo como procesado.
+        Marca un archivo como procesado (persistido a disco periódicamente).
         """
         self.processed_files.add(file_id)
+        self._unpersisted_adds += 1
+        if self._unpersisted_adds >= PROCESSED_PERSIST_EVERY:
+            self._persist_processed_files()
     
     def monitor_folder(
         self, 
@@ -265,40 +522,71 @@ class GoogleDriveService:
         """
         interval = interval or DRIVE_POLLING_INTERVAL
         logger.info(f"Iniciando monitoreo de carpeta. Intervalo: {interval}s")
-        
-        while True:
-            try:
-                new_files = self.get_new_files()
-                
-                for file_info in new_files:
-                    logger.info(f"Nuevo archivo detectado: {file_info['name']}")
-                    
-                    # Descargar archivo
-                    local_path = self.download_file(
-                        file_info['id'], 
-                        file_info['name']
-                    )
-                    
-                    if local_path:
-                        try:
-                            # Ejecutar callback
-                            callback(file_info, local_path)
-                            self.mark_as_processed(file_info['id'])
-                        except Exception as e:
-                            logger.error(f"Error procesando {file_info['name']}: {str(e)}")
-                        finally:
-                            # Limpiar archivo temporal
-                            if local_path.exists():
-                                local_path.unlink()
-                
-                time.sleep(interval)
-                
-            except KeyboardInterrupt:
-                logger.info("Monitoreo detenido por el usuario.")
-                break
-            except Exception as e:
-                logger.error(f"Error en monitoreo: {str(e)}")
-                time.sleep(interval)
+
+        executor = self._get_download_executor()
+        process_executor = self._get_process_executor()
+
+        # Backoff exponencial cuando la carpeta está inactiva (tope 5 min)
+        cur_interval = interval
+
+        try:
+            while True:
+                try:
+                    new_files = self.get_new_files()
+
+                    if new_files:
+                        cur_interval = interval
+                        # Descargar todos los archivos nuevos en paralelo;
+                        # el callback (OCR) se ejecuta conforme van llegando.
+                        # Se marcan en vuelo ANTES de encolar: el siguiente
+                        # poll no debe volver a listarlos mientras se procesan
+                        self._in_flight.update(f['id'] for f in new_files)
+                        futures = {
+                            executor.submit(self.download_file, f['id'], f['name']): f
+                            for f in new_files
+                        }
+
+                        for future in as_completed(futures):
+                            file_info = futures[future]
+                            logger.info(f"Nuevo archivo detectado: {file_info['name']}")
+
+                            try:
+                                local_path = future.result()
+                            except Exception as e:
+                                logger.error(f"Error descargando {file_info['name']}: {str(e)}")
+                                local_path = None
+
+                            if local_path:
+                                # El procesamiento corre en su propio hilo: la
+                                # descarga del archivo N+1 y el siguiente poll
+                                # no esperan al OCR del archivo N
+                                process_executor.submit(
+                                    self._run_callback, callback, file_info, local_path
+                                )
+                            else:
+                                # Descarga fallida: liberar para reintentar
+                                # en el próximo poll
+                                self._in_flight.discard(file_info['id'])
+                    else:
+                        cur_interval = min(cur_interval * 2, MONITOR_MAX_INTERVAL)
+                        # Ciclo inactivo: buen momento para volcar marcas
+                        # pendientes sin competir con descargas u OCR
+                        if self._unpersisted_adds:
+                            self._persist_processed_files()
+
+                    time.sleep(cur_interval)
+
+                except KeyboardInterrupt:
+                    logger.info("Monitoreo detenido por el usuario.")
+                    break
+                except Exception as e:
+                    logger.error(f"Error en monitoreo: {str(e)}")
+                    time.sleep(cur_interval)
+        finally:
+            # Volcar lo pendiente al salir: sin esto se perderían hasta
+            # PROCESSED_PERSIST_EVERY-1 marcas y se reprocesarían al reiniciar
+            if self._unpersisted_adds:
+                self._persist_processed_files()
 
 
 def get_drive_service() -> GoogleDriveService:
@@ -1,42 +1,157 @@
 """
 Servicio para lectura de archivos Excel desde Google Drive
 """
+import functools
 import io
+import os
 import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload, MediaIoBaseUpload
+from openpyxl.utils import get_column_letter
 from google.oauth2.credentials import Credentials
-import pandas as pd
+# pandas/numpy se importan perezosamente dentro de los métodos de lectura:
+# suman ~300 ms de arranque que los caminos de solo-escritura no necesitan
 
 from config.settings import LDU_DRIVE_FOLDER_ID, GOOGLE_DRIVE_FOLDER_ID
-from services.drive_service import GoogleDriveService
+from services.drive_service import GoogleDriveService, gzip_request_builder
+
+# Columnas esperadas en un Excel LDU (constante: no se reconstruye por lectura)
+LDU_EXPECTED_COLUMNS = (
+    'City', 'Canal', 'Tipo', 'POS_vv', 'Name_Ruta',
+    'HC_Real', 'DNI', 'Last_Name', 'First_Name',
+    'MODEL', 'IMEI', 'REG', 'OK', 'USO', 'OBSERVATION'
+)
+
+# Mapa minúscula -> nombre canónico, calculado una sola vez; sirve de
+# membership para usecols y evita re-lowercasear los esperados por archivo
+LDU_EXPECTED_BY_LOWER = {c.lower(): c for c in LDU_EXPECTED_COLUMNS}
+
+# Identificadores largos: leerlos como string evita que pasen por float
+# (pérdida de precisión / notación científica en IMEIs de 15 dígitos)
+LDU_DTYPE_HINTS = {'DNI': 'string', 'IMEI': 'string', 'POS_vv': 'string'}
+
+# Tamaño máximo de workbook que se retiene en el cache de contenido
+CONTENT_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+# TTL del cache de metadata de archivo (get_file_info), en segundos
+FILE_INFO_CACHE_TTL = 30
+
+# Resultados parseados de read_ldu_excel retenidos en memoria
+PARSED_CACHE_MAX_ENTRIES = 4
+
+# Umbral a partir del cual las subidas usan el protocolo resumable
+# (por debajo, multipart en un solo request es más rápido)
+RESUMABLE_UPLOAD_THRESHOLD = 5 * 1024 * 1024
+
+# Códigos HTTP que ameritan reintento (rate limit / errores transitorios)
+_RETRYABLE_STATUSES = frozenset({429, 500, 502, 503})
+
+
+def _retry(max_attempts: int = 6, base: float = 0.5):
+    """Reintenta llamadas a la API ante 429/5xx con backoff exponencial.
+
+    Respeta el Retry-After que manda el servidor cuando está presente
+    (los 429 de Sheets suelen pedir esperas de varios segundos).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(max_attempts):
+                try:
+                    return func(*args, **kwargs)
+                except HttpError as e:
+                    status = getattr(e.resp, 'status', None)
+                    if status not in _RETRYABLE_STATUSES or attempt == max_attempts - 1:
+                        raise
+                    retry_after = e.resp.get('retry-after')
+                    if retry_after:
+                        delay = float(retry_after)
+                    else:
+                        delay = base * (2 ** attempt)
+                    print(f"{func.__name__}: HTTP {status}, reintento {attempt + 1} en {delay:.1f}s")
+                    time.sleep(delay)
+        return wrapper
+    return decorator
 
 
 class ExcelDriveService:
     """Servicio para leer archivos Excel desde Google Drive"""
     
-    def __init__(self):
-        self.drive_service = GoogleDriveService()
+    def __init__(self, drive_service: Optional[GoogleDriveService] = None):
+        # Reutilizar el servicio Drive compartido (mismo cliente HTTP autenticado)
+        self.drive_service = drive_service or GoogleDriveService()
         self.service = None
         self.ldu_folder_id = LDU_DRIVE_FOLDER_ID
+        # Cache file_id -> mimeType poblado por list_excel_files, evita un
+        # files().get extra por descarga
+        self._mime_cache: Dict[str, str] = {}
+        # Cache de contenido: file_id -> (modifiedTime, bytes). Un poll
+        # periódico sobre un archivo sin cambios no vuelve a descargarlo
+        self._content_cache: Dict[str, tuple] = {}
+        # Metadata por TTL corto y resultado parseado por modifiedTime:
+        # un re-sync inmediato del mismo archivo no repite Drive ni parseo
+        self._file_info_cache: Dict[str, tuple] = {}
+        self._parsed_cache: Dict[tuple, Dict[str, Any]] = {}
+        self._sheets_service = None
+        # Clientes por hilo para lecturas paralelas (httplib2 no es
+        # thread-safe; cada worker necesita su propio transporte)
+        self._local = threading.local()
         
     def _get_service(self):
-        """Obtiene el servicio de Drive autenticado"""
-        if self.service is None:
-            # Autenticar si no está autenticado
+        """Obtiene el servicio de Drive autenticado (compartido con GoogleDriveService)"""
+        # Autenticar si no está autenticado
+        if self.drive_service.service is None:
+            self.drive_service.authenticate()
+
+        if threading.current_thread() is threading.main_thread():
+            # Compartir el mismo cliente construido: un solo pool TCP/TLS
+            if self.service is None:
+                self.service = self.drive_service.service
+            return self.service
+
+        # Hilos worker: cliente propio sobre un transporte propio
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = build(
+                'drive', 'v3',
+                http=self.drive_service._build_http(),
+                requestBuilder=gzip_request_builder
+            )
+            self._local.service = service
+        return service
+
+    def _get_sheets_service(self):
+        """Obtiene el cliente de Sheets cacheado (build() parsea el discovery
+        document y arma el transporte HTTP: solo debe pagarse una vez)"""
+        if self._sheets_service is None:
             if self.drive_service.creds is None:
                 self.drive_service.authenticate()
-            self.service = build('drive', 'v3', credentials=self.drive_service.creds)
-        return self.service
+            self._sheets_service = build(
+                'sheets', 'v4',
+                credentials=self.drive_service.creds,
+                cache_discovery=False
+            )
+        return self._sheets_service
     
-    def list_excel_files(self, folder_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    def list_excel_files(
+        self,
+        folder_id: Optional[str] = None,
+        modified_after: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
         """
         Lista archivos Excel en una carpeta de Drive
         
         Args:
             folder_id: ID de la carpeta (usa LDU_DRIVE_FOLDER_ID por defecto)
+            modified_after: Timestamp ISO; si se indica, solo retorna
+                archivos modificados después de esa fecha (sync incremental)
             
         Returns:
             Lista de archivos con id, nombre, fecha de modificación
@@ -56,45 +171,83 @@ class ExcelDriveService:
             
             if target_folder:
                 query_parts.append(f"'{target_folder}' in parents")
+
+            if modified_after:
+                query_parts.append(f"modifiedTime > '{modified_after}'")
             
             query = " and ".join(query_parts)
-            
-            results = service.files().list(
-                q=query,
-                pageSize=50,
-                fields="files(id, name, mimeType, modifiedTime, size)"
-            ).execute()
-            
-            files = results.get('files', [])
-            
+
+            # Paginar: con pageSize=50 y sin pageToken las carpetas grandes
+            # quedaban truncadas en silencio. 'size' se elimina de la
+            # proyección (los Google Sheets siempre reportan 0)
+            files = []
+            page_token = None
+            while True:
+                results = service.files().list(
+                    q=query,
+                    pageSize=1000,
+                    fields="nextPageToken, files(id, name, mimeType, modifiedTime)",
+                    pageToken=page_token
+                ).execute()
+
+                files.extend(results.get('files', []))
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
+
+            for f in files:
+                self._mime_cache[f['id']] = f['mimeType']
+
             return [{
                 'id': f['id'],
                 'name': f['name'],
                 'mimeType': f['mimeType'],
-                'modifiedTime': f.get('modifiedTime'),
-                'size': f.get('size', 0)
+                'modifiedTime': f.get('modifiedTime')
             } for f in files]
             
         except Exception as e:
             print(f"Error listando archivos Excel: {e}")
             raise
     
-    def download_excel_file(self, file_id: str) -> bytes:
+    def download_excel_file(self, file_id: str, mime_type: Optional[str] = None):
         """
         Descarga un archivo Excel de Drive
-        
+
         Args:
             file_id: ID del archivo en Drive
-            
+            mime_type: Tipo MIME si el llamador ya lo conoce (p.ej. del
+                listado); evita el files().get previo a la descarga
+
         Returns:
-            Contenido del archivo en bytes
+            Handle de archivo con el contenido, posicionado al inicio.
+            Hasta 8 MB vive en memoria; más allá se derrama a disco
+            (SpooledTemporaryFile), evitando duplicar workbooks grandes
+            en RAM.
         """
         try:
             service = self._get_service()
             
-            # Obtener metadata del archivo
-            file_metadata = service.files().get(fileId=file_id, fields='mimeType,name').execute()
-            mime_type = file_metadata.get('mimeType', '')
+            # Obtener mimeType (del parámetro o del cache si ya se listó)
+            if mime_type is None:
+                mime_type = self._mime_cache.get(file_id)
+            if mime_type is None:
+                file_metadata = service.files().get(fileId=file_id, fields='mimeType,name').execute()
+                mime_type = file_metadata.get('mimeType', '')
+                self._mime_cache[file_id] = mime_type
+
+            # Si el archivo no cambió desde la última descarga, reusar el
+            # contenido cacheado: un files().get de modifiedTime (bytes)
+            # reemplaza la descarga completa del workbook
+            cached = self._content_cache.get(file_id)
+            if cached:
+                try:
+                    meta = service.files().get(
+                        fileId=file_id, fields='modifiedTime'
+                    ).execute()
+                    if meta.get('modifiedTime') == cached[0]:
+                        return io.BytesIO(cached[1])
+                except Exception:
+                    pass
             
             # Si es un Google Sheets, exportar como xlsx
             if mime_type == 'application/vnd.google-apps.spreadsheet':
@@ -106,15 +259,30 @@ class ExcelDriveService:
                 # Descargar archivo normal
                 request = service.files().get_media(fileId=file_id)
             
-            file_buffer = io.BytesIO()
-            downloader = MediaIoBaseDownload(file_buffer, request)
+            file_buffer = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+            downloader = MediaIoBaseDownload(file_buffer, request, chunksize=8 * 1024 * 1024)
             
             done = False
             while not done:
-                status, done = downloader.next_chunk()
-            
+                status, done = downloader.next_chunk(num_retries=2)
+
+            # Cachear workbooks chicos junto a su modifiedTime
+            size = file_buffer.seek(0, 2)
             file_buffer.seek(0)
-            return file_buffer.read()
+            if size <= CONTENT_CACHE_MAX_BYTES:
+                try:
+                    meta = service.files().get(
+                        fileId=file_id, fields='modifiedTime'
+                    ).execute()
+                    self._content_cache[file_id] = (
+                        meta.get('modifiedTime'), file_buffer.read()
+                    )
+                    file_buffer.seek(0)
+                except Exception:
+                    pass
+
+            # Retornar el handle directamente: evita la copia bytes intermedia
+            return file_buffer
             
         except Exception as e:
             print(f"Error descargando archivo Excel {file_id}: {e}")
@@ -124,8 +292,10 @@ class ExcelDriveService:
         self, 
         file_id: str, 
         sheet_name: Optional[str] = None,
-        header_row: int = 0
-    ) -> pd.DataFrame:
+        header_row: int = 0,
+        dtype: Optional[Dict[str, Any]] = None,
+        usecols=None
+    ) -> "pd.DataFrame":
         """
         Lee un archivo Excel de Drive y lo convierte a DataFrame
         
@@ -133,104 +303,242 @@ class ExcelDriveService:
             file_id: ID del archivo en Drive
             sheet_name: Nombre de la hoja (opcional, usa la primera)
             header_row: Fila del encabezado (0-indexed)
+            dtype: Dtypes por columna a forzar en la lectura (opcional)
+            usecols: Filtro de columnas de pd.read_excel (opcional)
             
         Returns:
             DataFrame con los datos del Excel
         """
+        import pandas as pd
+
         try:
-            content = self.download_excel_file(file_id)
-            
-            # Leer Excel con pandas
-            df = pd.read_excel(
-                io.BytesIO(content),
-                sheet_name=sheet_name if sheet_name else 0,
-                header=header_row
-            )
-            
+            buffer = self.download_excel_file(file_id)
+
+            # Leer Excel con pandas directamente desde el buffer descargado.
+            # calamine (Rust) parsea xlsx un orden de magnitud más rápido que
+            # openpyxl; si no está instalado se cae al engine por defecto.
+            try:
+                df = pd.read_excel(
+                    buffer,
+                    sheet_name=sheet_name if sheet_name else 0,
+                    header=header_row,
+                    dtype=dtype,
+                    usecols=usecols,
+                    engine='calamine'
+                )
+            except ImportError:
+                # Fallback openpyxl en modo read_only: streaming en lugar de
+                # cargar el grafo completo de celdas en memoria
+                buffer.seek(0)
+                try:
+                    df = pd.read_excel(
+                        buffer,
+                        sheet_name=sheet_name if sheet_name else 0,
+                        header=header_row,
+                        dtype=dtype,
+                        usecols=usecols,
+                        engine='openpyxl',
+                        engine_kwargs={
+                            'read_only': True,
+                            'data_only': True,
+                            'keep_links': False
+                        }
+                    )
+                except TypeError:
+                    # pandas < 2.0 no acepta engine_kwargs
+                    buffer.seek(0)
+                    df = pd.read_excel(
+                        buffer,
+                        sheet_name=sheet_name if sheet_name else 0,
+                        header=header_row,
+                        dtype=dtype,
+                        usecols=usecols
+                    )
+
             return df
             
         except Exception as e:
             print(f"Error leyendo Excel a DataFrame: {e}")
             raise
     
-    def read_ldu_excel(self, file_id: str) -> Dict[str, Any]:
+    def read_ldu_excel(
+        self,
+        file_id: str,
+        include_raw: bool = False,
+        columnar: bool = False
+    ) -> Dict[str, Any]:
         """
         Lee un archivo Excel de LDU y retorna datos estructurados
         
         Args:
             file_id: ID del archivo en Drive
+            include_raw: Si True, cada fila incluye '_raw_row' con los
+                nombres de columna originales (duplica memoria; solo
+                para quien lo necesite explícitamente)
+            columnar: Si True, retorna 'data_columnar' (dict columna ->
+                lista de valores) en lugar de 'data'; evita repetir cada
+                nombre de columna una vez por fila
             
         Returns:
             Dict con:
                 - 'data': Lista de diccionarios con cada fila
+                  (o 'data_columnar' + 'row_numbers' si columnar=True)
                 - 'columns': Lista de columnas originales
                 - 'total_rows': Total de filas
                 - 'file_id': ID del archivo
         """
+        import numpy as np
+
+        # Cache por versión del archivo: una segunda lectura del mismo
+        # modifiedTime (reintento, re-sync inmediato) devuelve el
+        # resultado ya parseado sin tocar Drive
+        cache_key = None
         try:
-            df = self.read_excel_to_dataframe(file_id)
+            modified = self.get_file_info(file_id).get('modifiedTime')
+            if modified:
+                cache_key = (file_id, modified, include_raw, columnar)
+                cached = self._parsed_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+        except Exception:
+            pass
+
+        try:
+            # Filtrar columnas en el parser: las no mapeadas nunca se
+            # materializan (el resto del método igual las descartaba)
+            df = self.read_excel_to_dataframe(
+                file_id,
+                dtype=LDU_DTYPE_HINTS,
+                usecols=lambda c: str(c).strip().lower() in LDU_EXPECTED_BY_LOWER
+            )
             
             # Normalizar nombres de columnas (strip, lowercase para comparación)
             df.columns = df.columns.str.strip()
             
-            # Mapeo de columnas esperadas
-            expected_columns = [
-                'City', 'Canal', 'Tipo', 'POS_vv', 'Name_Ruta', 
-                'HC_Real', 'DNI', 'Last_Name', 'First_Name', 
-                'MODEL', 'IMEI', 'REG', 'OK', 'USO', 'OBSERVATION'
-            ]
-            
-            # Verificar columnas presentes
+            # Verificar columnas presentes (lookup case-insensitive por dict)
+            lower_to_actual = {c.lower(): c for c in df.columns}
+
             missing_columns = []
             column_mapping = {}
-            
-            for expected in expected_columns:
-                # Buscar coincidencia case-insensitive
-                found = None
-                for col in df.columns:
-                    if col.lower() == expected.lower():
-                        found = col
-                        break
-                
+
+            for lower, expected in LDU_EXPECTED_BY_LOWER.items():
+                found = lower_to_actual.get(lower)
                 if found:
                     column_mapping[expected] = found
                 else:
                     missing_columns.append(expected)
             
-            # Convertir a lista de diccionarios con número de fila
-            rows = []
-            for idx, row in df.iterrows():
-                row_dict = {
-                    '_row_number': idx + 2,  # +2 porque idx es 0-based y hay header
-                    '_raw_row': row.to_dict()
-                }
-                
-                # Agregar columnas mapeadas
-                for expected, actual in column_mapping.items():
-                    value = row.get(actual)
-                    # Convertir NaN a None
-                    if pd.isna(value):
-                        value = None
-                    elif isinstance(value, float) and value == int(value):
-                        value = int(value)
-                    row_dict[expected] = value
-                
-                rows.append(row_dict)
-            
-            return {
-                'data': rows,
+            # Convertir a lista de diccionarios con número de fila.
+            # Operaciones por columna en lugar de por celda: evita el
+            # overhead de iterrows/pd.isna por cada valor en archivos grandes
+            if column_mapping:
+                mapped = df[list(column_mapping.values())].rename(
+                    columns={actual: expected for expected, actual in column_mapping.items()}
+                )
+
+                # Máscara de no-nulos calculada una sola vez y reutilizada
+                # para la coerción float->int y para el NaN -> None final
+                notna = mapped.notna()
+
+                # Floats con valor entero -> int (una pasada por columna)
+                for col in mapped.columns[mapped.dtypes == float]:
+                    serie = mapped[col]
+                    enteros = notna[col] & np.isfinite(serie) & (serie % 1 == 0)
+                    if enteros.any():
+                        mapped[col] = serie.astype(object)
+                        mapped.loc[enteros, col] = serie[enteros].astype(int)
+
+                # NaN -> None en bloque
+                mapped = mapped.astype(object).where(notna, None)
+            else:
+                mapped = df.iloc[:, :0]
+
+            result = {
                 'columns': list(df.columns),
-                'expected_columns': expected_columns,
+                'expected_columns': list(LDU_EXPECTED_COLUMNS),
                 'missing_columns': missing_columns,
                 'column_mapping': column_mapping,
-                'total_rows': len(rows),
+                'total_rows': len(df),
                 'file_id': file_id
             }
+
+            if columnar:
+                # SoA: una lista por columna, sin dict por fila
+                result['data_columnar'] = {
+                    col: mapped[col].tolist() for col in mapped.columns
+                }
+                result['row_numbers'] = list(range(2, len(df) + 2))
+                self._cache_parsed(cache_key, result)
+                return result
+
+            mapped_rows = (
+                mapped.to_dict(orient='records')
+                if len(mapped.columns) else [{} for _ in range(len(df))]
+            )
+
+            # '_raw_row' duplicaba cada celda; solo se materializa bajo demanda
+            raw_rows = df.to_dict(orient='records') if include_raw else None
+
+            rows = []
+            for idx, mapped_row in enumerate(mapped_rows):
+                row_dict = {
+                    '_row_number': idx + 2  # +2 porque idx es 0-based y hay header
+                }
+                if raw_rows is not None:
+                    row_dict['_raw_row'] = raw_rows[idx]
+                row_dict.update(mapped_row)
+                rows.append(row_dict)
+
+            result['data'] = rows
+            self._cache_parsed(cache_key, result)
+            return result
             
         except Exception as e:
             print(f"Error leyendo Excel LDU: {e}")
             raise
     
+    def _cache_parsed(self, cache_key, result: Dict[str, Any]) -> None:
+        """Retiene el resultado parseado, desalojando la entrada más vieja"""
+        if cache_key is None:
+            return
+        if len(self._parsed_cache) >= PARSED_CACHE_MAX_ENTRIES:
+            self._parsed_cache.pop(next(iter(self._parsed_cache)), None)
+        self._parsed_cache[cache_key] = result
+    
+    def bulk_read_ldu_excels(
+        self,
+        file_ids: List[str],
+        max_workers: int = 8
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Lee varios archivos LDU en paralelo
+
+        La descarga y el parseo son I/O-bound (y calamine libera el GIL),
+        así que un pool de hilos acerca el tiempo total al del archivo
+        más lento en lugar de la suma de todos.
+
+        Args:
+            file_ids: IDs de los archivos en Drive
+            max_workers: Cantidad máxima de lecturas simultáneas
+
+        Returns:
+            Dict file_id -> resultado de read_ldu_excel (None si falló)
+        """
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.read_ldu_excel, fid): fid
+                for fid in file_ids
+            }
+            for future in as_completed(futures):
+                fid = futures[future]
+                try:
+                    results[fid] = future.result()
+                except Exception as e:
+                    print(f"Error leyendo Excel {fid}: {e}")
+                    results[fid] = None
+        return results
+
     def get_file_info(self, file_id: str) -> Dict[str, Any]:
         """
         Obtiene información de un archivo
@@ -241,15 +549,19 @@ class ExcelDriveService:
         Returns:
             Dict con metadata del archivo
         """
+        cached = self._file_info_cache.get(file_id)
+        if cached is not None and time.monotonic() - cached[0] < FILE_INFO_CACHE_TTL:
+            return cached[1]
+        
         try:
             service = self._get_service()
             
             file = service.files().get(
                 fileId=file_id,
-                fields='id,name,mimeType,modifiedTime,size,owners,createdTime'
+                fields='id,name,mimeType,modifiedTime,size,createdTime'
             ).execute()
             
-            return {
+            info = {
                 'id': file.get('id'),
                 'name': file.get('name'),
                 'mimeType': file.get('mimeType'),
@@ -258,14 +570,90 @@ class ExcelDriveService:
                 'size': file.get('size', 0),
                 'owners': file.get('owners', [])
             }
+            self._file_info_cache[file_id] = (time.monotonic(), info)
+            return info
             
         except Exception as e:
             print(f"Error obteniendo info del archivo: {e}")
             raise
 
+    def _build_upload_media(self, file_content, mime_type: str):
+        """Crea el media body de una subida sin duplicar el contenido
+
+        Acepta un path (MediaFileUpload lee del disco), un file-like
+        (se usa tal cual) o bytes (único caso que copia a un BytesIO).
+        El protocolo resumable se activa solo por encima del umbral.
+        """
+        if isinstance(file_content, str):
+            size = os.path.getsize(file_content)
+            return MediaFileUpload(
+                file_content,
+                mimetype=mime_type,
+                resumable=size > RESUMABLE_UPLOAD_THRESHOLD
+            )
+
+        if isinstance(file_content, (bytes, bytearray)):
+            stream = io.BytesIO(file_content)
+            size = len(file_content)
+        else:
+            stream = file_content
+            size = stream.seek(0, 2)
+            stream.seek(0)
+
+        return MediaIoBaseUpload(
+            stream,
+            mimetype=mime_type,
+            resumable=size > RESUMABLE_UPLOAD_THRESHOLD
+        )
+
+    def get_files_info(self, file_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene metadata de varios archivos en un solo request HTTP
+
+        Empaqueta los files().get en un BatchHttpRequest: N round-trips
+        de metadata colapsan en 1 (la descarga de media no es
+        batcheable, pero la metadata sí).
+
+        Args:
+            file_ids: IDs de los archivos
+
+        Returns:
+            Dict file_id -> metadata (los que fallaron no aparecen)
+        """
+        try:
+            service = self._get_service()
+            results: Dict[str, Dict[str, Any]] = {}
+
+            def _collect(request_id, response, exception):
+                if exception is not None:
+                    print(f"Error obteniendo info de {request_id}: {exception}")
+                    return
+                results[response['id']] = response
+                self._mime_cache[response['id']] = response.get('mimeType', '')
+
+            # Máximo 100 llamadas por batch según la API de Drive
+            for i in range(0, len(file_ids), 100):
+                batch = service.new_batch_http_request(callback=_collect)
+                for fid in file_ids[i:i + 100]:
+                    batch.add(
+                        service.files().get(
+                            fileId=fid,
+                            fields='id,name,mimeType,modifiedTime,size'
+                        ),
+                        request_id=fid
+                    )
+                batch.execute()
+
+            return results
+
+        except Exception as e:
+            print(f"Error obteniendo info en batch: {e}")
+            raise
+
+    @_retry()
     def upload_file(
-        self, 
-        file_content: bytes, 
+        self,
+        file_content: bytes,
         filename: str, 
         mime_type: str = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
         folder_id: Optional[str] = None
@@ -291,11 +679,7 @@ class ExcelDriveService:
                 'parents': [target_folder] if target_folder else []
             }
             
-            media = MediaIoBaseUpload(
-                io.BytesIO(file_content),
-                mimetype=mime_type,
-                resumable=True
-            )
+            media = self._build_upload_media(file_content, mime_type)
             
             file = service.files().create(
                 body=file_metadata,
@@ -314,6 +698,7 @@ class ExcelDriveService:
             print(f"Error subiendo archivo a Drive: {e}")
             raise
 
+    @_retry()
     def update_file(
         self, 
         file_id: str,
@@ -332,15 +717,9 @@ class ExcelDriveService:
             Dict con info del archivo actualizado
         """
         try:
-            from googleapiclient.http import MediaIoBaseUpload
-            
             service = self._get_service()
             
-            media = MediaIoBaseUpload(
-                io.BytesIO(file_content),
-                mimetype=mime_type,
-                resumable=True
-            )
+            media = self._build_upload_media(file_content, mime_type)
             
             file = service.files().update(
                 fileId=file_id,
@@ -359,6 +738,7 @@ class ExcelDriveService:
             print(f"Error actualizando archivo en Drive: {e}")
             raise
 
+    @_retry()
     def upload_and_convert_to_sheets(
         self, 
         file_content: bytes, 
@@ -390,10 +770,9 @@ class ExcelDriveService:
                 'parents': [target_folder] if target_folder else []
             }
             
-            media = MediaIoBaseUpload(
-                io.BytesIO(file_content),
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                resumable=True
+            media = self._build_upload_media(
+                file_content,
+                'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
             )
             
             file = service.files().create(
@@ -414,6 +793,7 @@ class ExcelDriveService:
             print(f"Error subiendo y convirtiendo a Sheets: {e}")
             raise
 
+    @_retry()
     def update_sheet_cell(
         self,
         spreadsheet_id: str,
@@ -436,13 +816,7 @@ class ExcelDriveService:
             True si se actualizó correctamente
         """
         try:
-            from googleapiclient.discovery import build
-            
-            # Obtener servicio de Sheets
-            if self.drive_service.creds is None:
-                self.drive_service.authenticate()
-            
-            sheets_service = build('sheets', 'v4', credentials=self.drive_service.creds)
+            sheets_service = self._get_sheets_service()
             
             range_notation = f"'{sheet_name}'!{column}{row}"
             
@@ -459,10 +833,14 @@ class ExcelDriveService:
             
             return True
             
+        except HttpError:
+            # Dejar pasar al decorador _retry (429/5xx se reintentan)
+            raise
         except Exception as e:
             print(f"Error actualizando celda: {e}")
             return False
 
+    @_retry()
     def update_sheet_row(
         self,
         spreadsheet_id: str,
@@ -485,12 +863,7 @@ class ExcelDriveService:
             True si se actualizó correctamente
         """
         try:
-            from googleapiclient.discovery import build
-            
-            if self.drive_service.creds is None:
-                self.drive_service.authenticate()
-            
-            sheets_service = build('sheets', 'v4', credentials=self.drive_service.creds)
+            sheets_service = self._get_sheets_service()
             
             # Preparar updates
             data = []
@@ -517,10 +890,71 @@ class ExcelDriveService:
             
             return True
             
+        except HttpError:
+            raise
         except Exception as e:
             print(f"Error actualizando fila: {e}")
             return False
 
+    @_retry()
+    def update_sheet_rows(
+        self,
+        spreadsheet_id: str,
+        sheet_name: str,
+        rows: List[tuple],
+        column_mapping: Dict[str, str]
+    ) -> bool:
+        """
+        Actualiza varias filas de un Google Sheets en un solo batchUpdate
+
+        En lugar de un round-trip HTTP por fila (update_sheet_row en un
+        loop), empaqueta todas las celdas en una sola llamada, en grupos
+        de hasta 100 rangos por request.
+
+        Args:
+            spreadsheet_id: ID del Google Sheets
+            sheet_name: Nombre de la hoja
+            rows: Lista de tuplas (numero_fila, {columna: valor})
+            column_mapping: Dict con nombre_columna->letra_columna
+
+        Returns:
+            True si todos los batches se aplicaron correctamente
+        """
+        try:
+            sheets_service = self._get_sheets_service()
+
+            data = []
+            for row, values in rows:
+                for col_name, value in values.items():
+                    if col_name in column_mapping:
+                        col_letter = column_mapping[col_name]
+                        data.append({
+                            'range': f"'{sheet_name}'!{col_letter}{row}",
+                            'values': [[value]]
+                        })
+
+            if not data:
+                return True
+
+            # Máximo ~100 rangos por batchUpdate
+            for i in range(0, len(data), 100):
+                body = {
+                    'valueInputOption': 'USER_ENTERED',
+                    'data': data[i:i + 100]
+                }
+                sheets_service.spreadsheets().values().batchUpdate(
+                    spreadsheetId=spreadsheet_id,
+                    body=body
+                ).execute()
+
+            return True
+
+        except HttpError:
+            raise
+        except Exception as e:
+            print(f"Error actualizando filas en batch: {e}")
+            return False
+
     def get_column_letters(self, spreadsheet_id: str, sheet_name: str) -> Dict[str, str]:
         """
         Obtiene el mapeo de nombre de columna -> letra de columna
@@ -533,12 +967,7 @@ class ExcelDriveService:
             Dict con nombre_columna -> letra_columna
         """
         try:
-            from googleapiclient.discovery import build
-            
-            if self.drive_service.creds is None:
-                self.drive_service.authenticate()
-            
-            sheets_service = build('sheets', 'v4', credentials=self.drive_service.creds)
+            sheets_service = self._get_sheets_service()
             
             # Obtener primera fila (headers)
             result = sheets_service.spreadsheets().values().get(
@@ -548,18 +977,12 @@ class ExcelDriveService:
             
             headers = result.get('values', [[]])[0]
             
-            # Crear mapeo
-            mapping = {}
-            for idx, header in enumerate(headers):
-                # Convertir índice a letra(s)
-                col_letter = ''
-                temp = idx
-                while temp >= 0:
-                    col_letter = chr(65 + (temp % 26)) + col_letter
-                    temp = temp // 26 - 1
-                mapping[header] = col_letter
-            
-            return mapping
+            # Crear mapeo (get_column_letter cachea internamente y cubre
+            # todo el rango A..XFD con la semántica exacta de Excel)
+            return {
+                header: get_column_letter(idx + 1)
+                for idx, header in enumerate(headers)
+            }
             
         except Exception as e:
             print(f"Error obteniendo letras de columnas: {e}")
@@ -4,9 +4,105 @@ Implementa todas las reglas de transformación y validación del Excel
 """
 import re
 import time
+from functools import lru_cache
 from typing import Dict, Any, Optional, Tuple, List
 from datetime import datetime
 
+# Tabla de borrado para extraer dígitos con str.translate (C puro, sin motor
+# de regex). Cubre Latin-1 conservando solo 0-9 — isdigit() no sirve aquí
+# porque acepta superíndices (¹²³) que el \d del regex original descartaba;
+# lo que quede fuera del rango se filtra en el camino raro
+_NON_DIGITS_LATIN1 = str.maketrans(
+    '', '', ''.join(chr(c) for c in range(256) if chr(c) not in '0123456789')
+)
+
+
+def _as_clean_str(value: Any) -> str:
+    """Equivale a str(value).strip() sin alocar cuando ya viene limpio"""
+    if type(value) is str:
+        if value and (value[0].isspace() or value[-1].isspace()):
+            return value.strip()
+        return value
+    return str(value).strip()
+
+
+def _extract_digits(value: str) -> str:
+    """Filtra un string a solo dígitos sin invocar el motor de regex"""
+    cleaned = value.translate(_NON_DIGITS_LATIN1)
+    if cleaned and not cleaned.isdecimal():
+        # Caracteres fuera de Latin-1 que la tabla no cubre; isdecimal
+        # (categoría Nd) es lo que matchea \d, a diferencia de isdigit
+        cleaned = ''.join(c for c in cleaned if c.isdecimal())
+    return cleaned
+
+
+# Regex compilados al importar: evita el lookup en el cache interno de re
+# (compartido y acotado a 512 entradas) en cada llamada
+_MODEL_CLEAN_RX = re.compile(r'[^\w\s\-\+\/]')
+_NON_ALNUM_RX = re.compile(r'[^a-zA-Z0-9]')
+_DECIMAL_CLEAN_RX = re.compile(r'[^\d.]')
+
+# Tabla de borrado ASCII derivada del propio regex de modelo (paridad
+# exacta); los strings no-ASCII (ñ, acentos) siguen por el camino regex
+_MODEL_DELETE_ASCII = str.maketrans(
+    '', '', ''.join(chr(c) for c in range(128) if _MODEL_CLEAN_RX.match(chr(c)))
+)
+
+# Tabla de limpieza decimal Latin-1: coma -> punto y borrado de todo lo
+# que no sea dígito o punto, en una sola pasada de translate
+_DECIMAL_TRANS_LATIN1 = str.maketrans({
+    ',': '.',
+    **{
+        chr(c): None
+        for c in range(256)
+        if chr(c) != ',' and _DECIMAL_CLEAN_RX.match(chr(c))
+    }
+})
+
+# Metacaracteres que distinguen un patrón regex real de un literal
+_REGEX_META = set('\\[](){}?*+|.^$')
+
+# Campos que cuentan como "datos útiles" al detectar filas vacías
+_RELEVANT_FIELDS = (
+    'Account', 'Account_int', 'Supervisor', 'Zone', 'Departamento', 'City',
+    'Canal', 'Tipo', 'POS_vv', 'Name_Ruta', 'HC_Real',
+    'DNI', 'First_Name', 'Last_Name', 'MODEL', 'OBSERVATION',
+    'REG', 'OK', 'USO'
+)
+
+# Tokens que equivalen a celda vacía
+# 'nat' y '<na>' cubren los escalares faltantes de pandas (pd.NaT, pd.NA)
+# sin depender de pandas en este módulo
+_NULL_TOKENS = frozenset(['nan', 'none', 'null', '', 'na', 'n/a', '-', 'nat', '<na>'])
+
+
+# Núcleos puros memoizados: los exports LDU repiten los mismos valores
+# (POS, ciudad, canal, modelo...) miles de veces, así que cada string
+# distinto se normaliza una sola vez por proceso
+
+@lru_cache(maxsize=16384)
+def _normalize_text_cached(text_str: str) -> Optional[str]:
+    cleaned = ' '.join(text_str.split())
+    return cleaned if cleaned else None
+
+
+@lru_cache(maxsize=32768)
+def _normalize_name_cached(name_str: str) -> Optional[str]:
+    cleaned = name_str.strip()
+    return cleaned.title() if cleaned else None
+
+
+@lru_cache(maxsize=4096)
+def _normalize_model_cached(model_str: str) -> Optional[str]:
+    model_str = model_str.strip().upper()
+    if model_str.isascii():
+        # Filtrado por tabla de traducción: sin motor de regex
+        model_clean = model_str.translate(_MODEL_DELETE_ASCII)
+    else:
+        model_clean = _MODEL_CLEAN_RX.sub('', model_str)
+    model_clean = ' '.join(model_clean.split())
+    return model_clean if model_clean else None
+
 
 class LDUNormalizationService:
     """Servicio de normalización de datos LDU"""
@@ -60,6 +156,35 @@ class LDUNormalizationService:
             r'HURTO'
         ]
     }
+
+    # Por estado, separar patrones literales (la mayoría) de los que
+    # requieren regex: para los literales un substring-scan en C
+    # reemplaza al motor de expresiones regulares
+    _ESTADO_MATCHERS = []
+    for _estado, _patterns in ESTADO_PATTERNS.items():
+        _literals = tuple(
+            p for p in _patterns if not any(c in _REGEX_META for c in p)
+        )
+        _complejos = [p for p in _patterns if any(c in _REGEX_META for c in p)]
+        _ESTADO_MATCHERS.append((
+            _estado,
+            _literals,
+            re.compile('|'.join(f'(?:{p})' for p in _complejos), re.IGNORECASE)
+            if _complejos else None
+        ))
+    del _estado, _patterns, _literals, _complejos
+
+    # Alternación fusionada de TODOS los patrones: un solo search descarta
+    # en una pasada las observaciones que no matchean ningún estado (el
+    # caso común), sin recorrer los 7 regex por estado
+    _ANY_ESTADO_RX = re.compile(
+        '|'.join(
+            f'(?:{p})'
+            for patterns in ESTADO_PATTERNS.values()
+            for p in patterns
+        ),
+        re.IGNORECASE
+    )
     
     def _is_empty_row(self, row: Dict[str, Any]) -> bool:
         """
@@ -71,20 +196,19 @@ class LDUNormalizationService:
         Returns:
             True si la fila no tiene datos útiles, False si tiene al menos un dato
         """
-        # Campos relevantes a verificar (excluir campos internos)
-        relevant_fields = [
-            'Account', 'Account_int', 'Supervisor', 'Zone', 'Departamento', 'City',
-            'Canal', 'Tipo', 'POS_vv', 'Name_Ruta', 'HC_Real',
-            'DNI', 'First_Name', 'Last_Name', 'MODEL', 'OBSERVATION',
-            'REG', 'OK', 'USO'
-        ]
-        
-        for field in relevant_fields:
+        for field in _RELEVANT_FIELDS:
             value = row.get(field)
-            if value is not None:
-                value_str = str(value).strip().lower()
-                if value_str and value_str not in ['nan', 'none', 'null', '', 'na', 'n/a', '-']:
+            if value is None:
+                continue
+            if isinstance(value, str):
+                # strip+lower solo cuando hace falta comparar contra tokens
+                if value.strip().lower() not in _NULL_TOKENS:
                     return False  # Tiene al menos un dato
+            elif isinstance(value, (int, float)):
+                if value == value:  # NaN es el único número "vacío"
+                    return False
+            elif str(value).strip().lower() not in _NULL_TOKENS:
+                return False
         
         return True  # Fila vacía
     
@@ -108,15 +232,21 @@ class LDUNormalizationService:
             return True, unique_id, "sin_imei"
         
         # Convertir a string y limpiar
-        imei_str = str(imei).strip()
+        imei_str = _as_clean_str(imei)
+        
+        # Camino rápido: la gran mayoría de los IMEI ya vienen como
+        # 14-16 dígitos limpios; isdecimal (no isdigit, que acepta
+        # superíndices) evita limpieza y comparaciones
+        if imei_str.isdecimal() and 14 <= len(imei_str) <= 16:
+            return True, imei_str, None
         
         # Caso 2: String vacío o valores nulos conocidos
-        if not imei_str or imei_str.lower() in ['nan', 'none', 'null', '', 'na', 'n/a', '-']:
+        if not imei_str or imei_str.lower() in _NULL_TOKENS:
             unique_id = self._generate_sin_imei_id(row_number, row_data)
             return True, unique_id, "sin_imei"
         
         # Remover caracteres no numéricos
-        imei_clean = re.sub(r'[^\d]', '', imei_str)
+        imei_clean = _extract_digits(imei_str)
         
         # Caso 3: Sin dígitos después de limpiar (ej: "---" o "abc")
         if not imei_clean:
@@ -153,14 +283,14 @@ class LDUNormalizationService:
         """
         if row_data:
             # Usar campos que identifican la fila de forma única
-            name_ruta = str(row_data.get('Name_Ruta', '')).strip()[:20]
-            dni = str(row_data.get('DNI', '')).strip()
-            account = str(row_data.get('Account', '')).strip()[:10]
+            name_ruta = _as_clean_str(row_data.get('Name_Ruta', ''))[:20]
+            dni = _as_clean_str(row_data.get('DNI', ''))
+            account = _as_clean_str(row_data.get('Account', ''))[:10]
             
             # Limpiar caracteres especiales
-            name_ruta = re.sub(r'[^a-zA-Z0-9]', '', name_ruta)
-            dni = re.sub(r'[^0-9]', '', dni)
-            account = re.sub(r'[^a-zA-Z0-9]', '', account)
+            name_ruta = _NON_ALNUM_RX.sub('', name_ruta)
+            dni = _extract_digits(dni)
+            account = _NON_ALNUM_RX.sub('', account)
             
             # Crear ID basado en estos campos + número de fila
             if dni:
@@ -186,8 +316,7 @@ class LDUNormalizationService:
         if dni is None:
             return None
         
-        dni_str = str(dni).strip()
-        dni_clean = re.sub(r'[^\d]', '', dni_str)
+        dni_clean = _extract_digits(_as_clean_str(dni))
         
         return dni_clean if dni_clean else None
     
@@ -204,13 +333,7 @@ class LDUNormalizationService:
         if name is None:
             return None
         
-        name_str = str(name).strip()
-        
-        if not name_str:
-            return None
-        
-        # Convertir a Title Case
-        return name_str.title()
+        return _normalize_name_cached(str(name))
     
     def normalize_model(self, model: Any) -> Optional[str]:
         """
@@ -225,15 +348,7 @@ class LDUNormalizationService:
         if model is None:
             return None
         
-        model_str = str(model).strip().upper()
-        
-        # Limpiar caracteres extraños pero mantener alfanuméricos y algunos especiales
-        model_clean = re.sub(r'[^\w\s\-\+\/]', '', model_str)
-        
-        # Normalizar espacios
-        model_clean = re.sub(r'\s+', ' ', model_clean).strip()
-        
-        return model_clean if model_clean else None
+        return _normalize_model_cached(str(model))
     
     def normalize_decimal(self, value: Any) -> Optional[float]:
         """
@@ -253,13 +368,15 @@ class LDUNormalizationService:
             if isinstance(value, (int, float)):
                 return float(value)
             
-            # Convertir string
-            value_str = str(value).strip()
-            # Reemplazar coma por punto
-            value_str = value_str.replace(',', '.')
-            # Remover todo excepto dígitos y punto
-            value_str = re.sub(r'[^\d.]', '', value_str)
-            
+            # Convertir string: coma a punto y limpieza de no-dígitos en
+            # una sola pasada de translate
+            value_str = str(value)
+            if value_str.isascii():
+                value_str = value_str.translate(_DECIMAL_TRANS_LATIN1)
+            else:
+                # Dígitos Unicode fuera de Latin-1: mismo camino regex
+                value_str = _DECIMAL_CLEAN_RX.sub('', value_str.replace(',', '.'))
+
             return float(value_str) if value_str else None
             
         except (ValueError, TypeError):
@@ -278,12 +395,7 @@ class LDUNormalizationService:
         if text is None:
             return None
         
-        text_str = str(text).strip()
-        
-        # Normalizar espacios múltiples
-        text_str = re.sub(r'\s+', ' ', text_str)
-        
-        return text_str if text_str else None
+        return _normalize_text_cached(str(text))
     
     def deduce_estado(self, observation: Any) -> str:
         """
@@ -298,21 +410,16 @@ class LDUNormalizationService:
         if observation is None:
             return ''
         
-        obs_upper = str(observation).upper().strip()
+        obs = _as_clean_str(observation)
         
-        if not obs_upper:
+        if not obs:
             return ''
         
-        # Buscar patrones en orden de prioridad
-        for estado, patterns in self.ESTADO_PATTERNS.items():
-            for pattern in patterns:
-                if re.search(pattern, obs_upper):
-                    return estado
-        
-        # No se encontró coincidencia
-        return ''
+        return _deduce_estado_cached(obs)
     
-    def normalize_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+    def normalize_row(
+        self, row: Dict[str, Any]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[List[str]], Optional[str]]:
         """
         Normaliza una fila completa del Excel según el mapeo establecido
         TODOS los registros se importan, incluso sin IMEI
@@ -321,12 +428,13 @@ class LDUNormalizationService:
             row: Diccionario con los datos de una fila
             
         Returns:
-            Dict con los datos normalizados para insertar en Supabase
-            Retorna None si la fila debe saltarse (vacía)
+            Tupla (registro, advertencias, imei_warning). El registro ya
+            tiene la forma exacta que espera Supabase (sin claves
+            internas); es None si la fila debe saltarse (vacía)
         """
         # Verificar si es una fila completamente vacía PRIMERO
         if self._is_empty_row(row):
-            return None  # Fila completamente vacía
+            return None, None, None  # Fila completamente vacía
         
         # Obtener número de fila para generar ID único si es necesario
         row_number = row.get('_row_number', 0)
@@ -355,9 +463,8 @@ class LDUNormalizationService:
         observation = self.normalize_text(row.get('OBSERVATION'))
         estado = self.deduce_estado(observation)
         
-        # Construir registro normalizado
+        # Construir registro normalizado (forma final para Supabase)
         normalized = {
-            '_valid': True,
             'imei': imei_normalized,
             'modelo': self.normalize_model(row.get('MODEL')),
             
@@ -395,26 +502,78 @@ class LDUNormalizationService:
             
             # Trazabilidad
             'raw_row': row.get('_raw_row', row),
-            'fila_origen': row.get('_row_number'),
-            
-            # Notas internas si hay problemas menores
-            '_warnings': [],
-            '_imei_warning': imei_warning  # Puede ser None o un mensaje de advertencia
+            'fila_origen': row.get('_row_number')
         }
         
-        # Agregar advertencia de IMEI si existe
+        # Advertencias como metadata aparte (no viajan a Supabase)
+        warnings = []
         if imei_warning:
-            normalized['_warnings'].append(imei_warning)
+            warnings.append(imei_warning)
         
-        # Agregar advertencias
         if not dni:
-            normalized['_warnings'].append('DNI vacío')
+            warnings.append('DNI vacío')
         
         if not estado:
-            normalized['_warnings'].append('Estado no determinado - requiere revisión manual')
+            warnings.append('Estado no determinado - requiere revisión manual')
         
-        return normalized
+        return normalized, warnings, imei_warning
     
+    def iter_normalize(self, rows: List[Dict[str, Any]], file_id: str):
+        """
+        Normaliza un lote fila a fila, generando cada registro válido
+
+        A diferencia de normalize_batch no acumula la lista completa en
+        memoria: el llamador puede ir enviando a Supabase por lotes
+        mientras se normaliza. Las estadísticas quedan disponibles en
+        self._last_stats una vez agotado el generador.
+
+        Args:
+            rows: Lista de diccionarios con las filas
+            file_id: ID del archivo de origen
+
+        Yields:
+            Dict con 'record', 'warnings' e 'imei' por fila válida
+        """
+        stats = {
+            'total': len(rows),
+            'valid': 0,
+            'skipped': 0,
+            'sin_imei': 0,
+            'warnings': 0
+        }
+        self._last_stats = stats
+
+        # Prefijo de referencia invariante: se formatea una vez por lote,
+        # no una por fila
+        ref_prefix = f"{file_id}:row_"
+
+        for row in rows:
+            normalized, warnings, imei_warning = self.normalize_row(row)
+
+            # Si es None, es una fila vacía - saltar
+            if normalized is None:
+                stats['skipped'] += 1
+                continue
+
+            # Agregar referencia al archivo (fila_origen siempre existe
+            # en el registro, aunque sea None)
+            normalized['archivo_origen_id'] = file_id
+            normalized['raw_excel_reference'] = ref_prefix + str(normalized['fila_origen'])
+            
+            if warnings:
+                stats['warnings'] += len(warnings)
+            
+            # Contar si es un registro sin IMEI original
+            if imei_warning == 'sin_imei':
+                stats['sin_imei'] += 1
+            
+            stats['valid'] += 1
+            yield {
+                'record': normalized,
+                'warnings': warnings,
+                'imei': normalized['imei']
+            }
+
     def normalize_batch(self, rows: List[Dict[str, Any]], file_id: str) -> Dict[str, Any]:
         """
         Normaliza un lote de filas
@@ -427,45 +586,184 @@ class LDUNormalizationService:
         Returns:
             Dict con registros válidos y estadísticas
         """
+        valid_records = list(self.iter_normalize(rows, file_id))
+        
+        return {
+            'valid_records': valid_records,
+            'errors': [],
+            'stats': self._last_stats
+        }
+
+    def normalize_batch_parallel(
+        self,
+        rows: List[Dict[str, Any]],
+        file_id: str,
+        chunk_size: int = 20000
+    ) -> Dict[str, Any]:
+        """
+        Normaliza un lote repartiendo segmentos entre procesos
+
+        Cada fila es independiente, así que los archivos realmente
+        grandes se dividen en segmentos contiguos que procesan workers
+        separados (sin GIL). Por debajo de chunk_size el costo de
+        serializar las filas supera la ganancia y se usa el camino
+        secuencial.
+
+        Args:
+            rows: Lista de diccionarios con las filas
+            file_id: ID del archivo de origen
+            chunk_size: Filas por segmento/worker
+
+        Returns:
+            Mismo formato que normalize_batch
+        """
+        if len(rows) <= chunk_size:
+            return self.normalize_batch(rows, file_id)
+
+        import os
+        from concurrent.futures import ProcessPoolExecutor
+
+        chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+        n_workers = min(os.cpu_count() or 1, len(chunks))
+
+        valid_records = []
+        stats = {
+            'total': len(rows),
+            'valid': 0,
+            'skipped': 0,
+            'sin_imei': 0,
+            'warnings': 0
+        }
+
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            # Segmentos contiguos: preserva el orden de filas del archivo
+            for result in executor.map(
+                _worker_normalize_chunk, chunks, [file_id] * len(chunks)
+            ):
+                valid_records.extend(result['valid_records'])
+                for key in ('valid', 'skipped', 'sin_imei', 'warnings'):
+                    stats[key] += result['stats'][key]
+
+        return {
+            'valid_records': valid_records,
+            'errors': [],
+            'stats': stats
+        }
+
+    def normalize_batch_df(self, rows: List[Dict[str, Any]], file_id: str) -> Dict[str, Any]:
+        """
+        Variante vectorizada de normalize_batch
+
+        Normaliza columna a columna con pandas: cada normalizador se
+        evalúa una sola vez por valor único (los exports LDU repiten
+        mucho POS, ciudad, canal, supervisor...) y el resultado se
+        propaga con Series.map. El IMEI y la detección de filas vacías
+        siguen siendo por fila porque dependen del contexto de la fila.
+        Produce exactamente la misma estructura que normalize_batch.
+        """
+        import pandas as pd
+
+        if not rows:
+            return {
+                'valid_records': [],
+                'errors': [],
+                'stats': {
+                    'total': 0, 'valid': 0, 'skipped': 0,
+                    'sin_imei': 0, 'warnings': 0
+                }
+            }
+
+        # dtype=object preserva los ints tal cual: sin él, una columna de
+        # enteros con huecos se coerce a float64 y normalize_text daría
+        # '1.0' donde el camino escalar produce '1'
+        df = pd.DataFrame(rows, dtype=object)
+
+        def _col(name):
+            if name in df.columns:
+                return df[name]
+            return pd.Series([None] * len(df), index=df.index, dtype=object)
+
+        def _map_unique(series, func):
+            # Un solo cálculo por valor distinto; None/NaN quedan en None
+            mapping = {}
+            for v in series.unique():
+                if v is None or (isinstance(v, float) and v != v):
+                    continue
+                mapping[v] = func(v)
+            out = series.map(mapping)
+            return out.astype(object).where(out.notna(), None)
+
+        texto = {
+            'account': 'Account', 'account_int': 'Account_int',
+            'zone': 'Zone', 'departamento': 'Departamento', 'city': 'City',
+            'canal': 'Canal', 'tipo': 'Tipo', 'campo_reg': 'REG',
+            'campo_ok': 'OK', 'uso': 'USO'
+        }
+        cols = {
+            dest: _map_unique(_col(src), self.normalize_text)
+            for dest, src in texto.items()
+        }
+        # Mantener region para compatibilidad
+        cols['region'] = cols['city']
+        cols['supervisor'] = _map_unique(_col('Supervisor'), self.normalize_name)
+        cols['responsable_dni'] = _map_unique(_col('DNI'), self.normalize_dni)
+        cols['responsable_nombre'] = _map_unique(_col('First_Name'), self.normalize_name)
+        cols['responsable_apellido'] = _map_unique(_col('Last_Name'), self.normalize_name)
+        cols['modelo'] = _map_unique(_col('MODEL'), self.normalize_model)
+        cols['cobertura_valor'] = _map_unique(_col('HC_Real'), self.normalize_decimal)
+
+        punto_venta = _map_unique(_col('POS_vv'), self.normalize_text)
+        nombre_ruta = _map_unique(_col('Name_Ruta'), self.normalize_text)
+        # Sin punto de venta pero con ruta: usar la ruta como punto de venta
+        cols['punto_venta'] = punto_venta.where(punto_venta.notna(), nombre_ruta)
+        cols['nombre_ruta'] = nombre_ruta
+
+        observaciones = _map_unique(_col('OBSERVATION'), self.normalize_text)
+        cols['observaciones'] = observaciones
+        estado = _map_unique(observaciones, self.deduce_estado)
+        cols['estado'] = estado.where(estado.notna(), '')
+
+        base_records = pd.DataFrame(cols).to_dict(orient='records')
+
         valid_records = []
         warnings_count = 0
         skipped_count = 0
         sin_imei_count = 0
-        
-        for row in rows:
-            normalized = self.normalize_row(row)
-            
-            # Si es None, es una fila vacía - saltar
-            if normalized is None:
+
+        for idx, row in enumerate(rows):
+            if self._is_empty_row(row):
                 skipped_count += 1
                 continue
-            
-            # Procesar registros válidos
-            if normalized.get('_valid'):
-                # Agregar referencia al archivo
-                normalized['archivo_origen_id'] = file_id
-                normalized['raw_excel_reference'] = f"{file_id}:row_{normalized.get('fila_origen', 'unknown')}"
-                
-                # Contar advertencias y registros sin IMEI
-                warnings = normalized.get('_warnings', [])
-                if warnings:
-                    warnings_count += len(warnings)
-                
-                # Contar si es un registro sin IMEI original
-                imei_warning = normalized.get('_imei_warning')
+
+            row_number = row.get('_row_number', 0)
+            _, imei_normalized, imei_warning = self.validate_imei(
+                row.get('IMEI'), row_number, row
+            )
+
+            record = base_records[idx]
+            record['imei'] = imei_normalized
+            record['raw_row'] = row.get('_raw_row', row)
+            record['fila_origen'] = row.get('_row_number')
+            record['archivo_origen_id'] = file_id
+            record['raw_excel_reference'] = f"{file_id}:row_{row.get('_row_number', 'unknown')}"
+
+            warnings = []
+            if imei_warning:
+                warnings.append(imei_warning)
                 if imei_warning == 'sin_imei':
                     sin_imei_count += 1
-                
-                # Remover campos internos antes de insertar
-                clean_record = {k: v for k, v in normalized.items() 
-                               if not k.startswith('_')}
-                
-                valid_records.append({
-                    'record': clean_record,
-                    'warnings': warnings,
-                    'imei': normalized['imei']
-                })
-        
+            if not record['responsable_dni']:
+                warnings.append('DNI vacío')
+            if not record['estado']:
+                warnings.append('Estado no determinado - requiere revisión manual')
+            warnings_count += len(warnings)
+
+            valid_records.append({
+                'record': record,
+                'warnings': warnings,
+                'imei': imei_normalized
+            })
+
         return {
             'valid_records': valid_records,
             'errors': [],
@@ -479,5 +777,49 @@ class LDUNormalizationService:
         }
 
 
+def _build_estado_matcher():
+    """Genera en import una función plana de coincidencia de estados.
+
+    ESTADO_PATTERNS es fijo al cargar la clase, así que en lugar de
+    iterar _ESTADO_MATCHERS por fila se emite (vía exec) una función
+    recta con cada chequeo inline y retorno temprano, en el mismo orden
+    de prioridad: los literales quedan como constantes del bytecode y
+    cada regex compleja como búsqueda pre-ligada.
+    """
+    env = {}
+    lines = ['def _match_estado(obs, obs_upper):']
+    for i, (estado, literals, pattern) in enumerate(
+        LDUNormalizationService._ESTADO_MATCHERS
+    ):
+        for literal in literals:
+            lines.append(f'    if {literal!r} in obs_upper: return {estado!r}')
+        if pattern is not None:
+            env[f'_rx_{i}'] = pattern.search
+            lines.append(f'    if _rx_{i}(obs): return {estado!r}')
+    lines.append("    return ''")
+    exec('\n'.join(lines), env)
+    return env['_match_estado']
+
+
+_match_estado = _build_estado_matcher()
+
+
+@lru_cache(maxsize=8192)
+def _deduce_estado_cached(obs: str) -> str:
+    """Deducción de estado memoizada por observación distinta"""
+    # Descarte rápido: una sola invocación del motor para el caso
+    # sin coincidencias
+    if not LDUNormalizationService._ANY_ESTADO_RX.search(obs):
+        return ''
+
+    # Coincidencia en orden de prioridad con la función generada
+    return _match_estado(obs, obs.upper())
+
+
+def _worker_normalize_chunk(rows: List[Dict[str, Any]], file_id: str) -> Dict[str, Any]:
+    """Worker de proceso: normaliza un segmento del lote"""
+    return ldu_normalization_service.normalize_batch(rows, file_id)
+
+
 # Instancia singleton
 ldu_normalization_service = LDUNormalizationService()
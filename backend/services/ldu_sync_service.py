@@ -2,14 +2,42 @@
 Servicio de sincronización LDU con Supabase
 Implementa lógica incremental, idempotente con auditoría completa
 """
+import asyncio
+import hashlib
 import uuid
 from typing import Dict, Any, List, Optional
 from datetime import datetime
+from decimal import Decimal
 import json
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson está en requirements
+    orjson = None
+
 from services.supabase_service import supabase_service
 from services.excel_drive_service import excel_drive_service
 from services.ldu_normalization_service import ldu_normalization_service
+from services.pg_pool import get_pool
+
+
+# Campos que se comparan para detectar cambios: tupla a nivel de módulo
+# para ligarla en tiempo de definición en los métodos calientes
+_COMPARE_FIELDS = (
+    'modelo', 'region', 'punto_venta', 'nombre_ruta', 'cobertura_valor',
+    'canal', 'tipo', 'campo_reg', 'campo_ok', 'uso', 'observaciones',
+    'estado', 'responsable_dni', 'responsable_nombre', 'responsable_apellido',
+    'account', 'account_int', 'supervisor', 'zone', 'departamento', 'city'
+)
+
+# Conjunto para membership O(1) al filtrar campos protegidos
+_COMPARE_FIELDS_SET = frozenset(_COMPARE_FIELDS)
+
+# Columnas TIMESTAMPTZ de ldu_registros: asyncpg tipa estricto y rechaza
+# los strings ISO del payload, hay que ligarlas como datetime
+_PG_TIMESTAMPTZ_COLS = frozenset(
+    ['fecha_ultima_verificacion', 'fecha_registro', 'fecha_actualizacion']
+)
 
 
 class LDUSyncService:
@@ -17,6 +45,15 @@ class LDUSyncService:
     
     def __init__(self):
         self.supabase = supabase_service.client
+        # Buffers de escritura: auditoría, historial y errores se acumulan
+        # durante la sincronización y se insertan en bloque (_flush_buffers)
+        self._audit_buffer = []
+        self._historial_buffer = []
+        self._error_buffer = []
+        # Catálogo de responsables en memoria durante una sincronización:
+        # None fuera de ella (las rutas interactivas consultan por DNI)
+        self._known_dnis = None
+        self._responsables_buffer = []
         
     async def sync_from_excel(
         self, 
@@ -44,14 +81,19 @@ class LDUSyncService:
             'usuario_ejecutor': user,
             'fecha_inicio': start_time.isoformat()
         }
+        insert_task = None
         
         try:
             # Obtener info del archivo
             file_info = excel_drive_service.get_file_info(file_id)
             importacion['archivo_nombre'] = file_info.get('name', 'unknown')
             
-            # Insertar registro de importación
-            self.supabase.table('ldu_importaciones').insert(importacion).execute()
+            # Insertar registro 'en_proceso' fuera del camino crítico: la
+            # lectura del Excel avanza mientras viaja el insert (el upsert
+            # final es quien fija el estado definitivo)
+            insert_task = asyncio.create_task(
+                asyncio.to_thread(self._insert_importacion, dict(importacion))
+            )
             
             # Leer Excel
             excel_data = excel_drive_service.read_ldu_excel(file_id)
@@ -93,6 +135,9 @@ class LDUSyncService:
                 user=user
             )
             
+            # Escribir auditoría, historial y errores acumulados en bloque
+            await self._flush_buffers()
+            
             # Calcular duración
             end_time = datetime.now()
             duration = int((end_time - start_time).total_seconds())
@@ -114,8 +159,11 @@ class LDUSyncService:
                 'columnas_faltantes': excel_data['missing_columns']
             }
             
-            # Actualizar registro de importación
-            self.supabase.table('ldu_importaciones').update({
+            # Cerrar registro de importación: upsert por id, de modo que
+            # el estado final se escribe aunque el insert inicial fallara
+            await insert_task
+            self.supabase.table('ldu_importaciones').upsert({
+                **importacion,
                 'estado': 'completado',
                 'total_filas': excel_data['total_rows'],
                 'insertados': sync_result['inserted'],
@@ -126,17 +174,23 @@ class LDUSyncService:
                 'fecha_fin': end_time.isoformat(),
                 'duracion_segundos': duration,
                 'resumen': resumen
-            }).eq('id', importacion_id).execute()
+            }, on_conflict='id', returning='minimal').execute()
             
             return resumen
             
         except Exception as e:
+            # Persistir lo acumulado antes de marcar la importación fallida
+            await self._flush_buffers()
+            
             # Registrar error en importación
-            self.supabase.table('ldu_importaciones').update({
+            if insert_task is not None:
+                await insert_task
+            self.supabase.table('ldu_importaciones').upsert({
+                **importacion,
                 'estado': 'error',
                 'mensaje_error': str(e),
                 'fecha_fin': datetime.now().isoformat()
-            }).eq('id', importacion_id).execute()
+            }, on_conflict='id', returning='minimal').execute()
             
             raise
     
@@ -177,17 +231,29 @@ class LDUSyncService:
         }
         
         try:
-            # Insertar registro de importación
-            self.supabase.table('ldu_importaciones').insert(importacion).execute()
-            
-            # Convertir DataFrame a lista de diccionarios con índice de fila
-            data = []
-            for idx, row in df.fillna('').iterrows():
-                row_dict = row.to_dict()
-                row_dict['_row_number'] = idx + 2  # +2 porque idx es 0-based y fila 1 es header
-                row_dict['_raw_row'] = row_dict.copy()
-                data.append(row_dict)
+            # Insertar registro 'en_proceso' fuera del camino crítico (la
+            # conversión y normalización avanzan mientras viaja el insert)
+            insert_task = asyncio.create_task(
+                asyncio.to_thread(self._insert_importacion, dict(importacion))
+            )
             
+            # Convertir DataFrame a lista de diccionarios por columnas:
+            # zip sobre las listas evita el overhead fila a fila de iterrows;
+            # tolist() boxea a tipos nativos (np.int64 no es serializable a
+            # JSON y rompería el payload de raw_row)
+            df_filled = df.fillna('')
+            cols = df_filled.columns.tolist()
+            data = [
+                # +2 porque idx es 0-based y fila 1 es header
+                dict(zip(cols, row), _row_number=idx + 2)
+                # Sin copia '_raw_row': la normalización usa la propia fila
+                # como referencia de trazabilidad cuando la clave no está
+                for idx, row in zip(
+                    df_filled.index,
+                    zip(*(df_filled[c].tolist() for c in cols))
+                )
+            ]
+
             if not data:
                 raise Exception("El archivo está vacío o no tiene datos válidos")
             
@@ -228,6 +294,9 @@ class LDUSyncService:
                 user=user
             )
             
+            # Escribir auditoría, historial y errores acumulados en bloque
+            await self._flush_buffers()
+            
             # Calcular duración
             end_time = datetime.now()
             duration = int((end_time - start_time).total_seconds())
@@ -253,8 +322,10 @@ class LDUSyncService:
                 'duracion_segundos': duration
             }
             
-            # Actualizar registro de importación (solo columnas que existen en la tabla)
-            self.supabase.table('ldu_importaciones').update({
+            # Cerrar registro de importación (solo columnas que existen en la tabla)
+            await insert_task
+            self.supabase.table('ldu_importaciones').upsert({
+                **importacion,
                 'estado': 'completado',
                 'total_filas': len(data),
                 'insertados': sync_result['inserted'],
@@ -264,17 +335,22 @@ class LDUSyncService:
                 'fecha_fin': end_time.isoformat(),
                 'duracion_segundos': duration,
                 'resumen': resumen  # El resumen JSONB tiene todos los detalles extra
-            }).eq('id', importacion_id).execute()
+            }, on_conflict='id', returning='minimal').execute()
             
             return resumen
             
         except Exception as e:
+            # Persistir lo acumulado antes de marcar la importación fallida
+            await self._flush_buffers()
+            
             # Registrar error en importación
-            self.supabase.table('ldu_importaciones').update({
+            await insert_task
+            self.supabase.table('ldu_importaciones').upsert({
+                **importacion,
                 'estado': 'error',
                 'mensaje_error': str(e),
                 'fecha_fin': datetime.now().isoformat()
-            }).eq('id', importacion_id).execute()
+            }, on_conflict='id', returning='minimal').execute()
             
             raise
     
@@ -310,132 +386,151 @@ class LDUSyncService:
         updated = 0
         unchanged = 0
         conflicts_count = 0
-        
+
+        if not records:
+            return {'inserted': 0, 'updated': 0, 'unchanged': 0, 'conflicts': 0}
+
+        # Timestamp lógico único del lote: todas las filas de una misma
+        # sincronización comparten el instante de verificación
+        now_iso = datetime.now().isoformat()
+
+        # Dedupe por IMEI dentro del lote: la clasificación usa un snapshot
+        # puntual, así que dos filas con el mismo IMEI caerían juntas en un
+        # mismo upsert y Postgres rechaza el statement completo ("cannot
+        # affect row a second time"). Gana la última aparición, igual que
+        # en el procesamiento secuencial original
+        by_imei = {r['imei']: r for r in records}
+        if len(by_imei) != len(records):
+            records = list(by_imei.values())
+
+        # Traer los registros existentes de TODO el lote en pocas consultas
+        # paginadas: un SELECT .in_() por página en lugar de uno por IMEI
+        existing_by_imei = {}
+        imeis = [r['imei'] for r in records]
+        for i in range(0, len(imeis), self.BULK_CHUNK):
+            result = self.supabase.table('ldu_registros').select('*').in_(
+                'imei', imeis[i:i + self.BULK_CHUNK]
+            ).execute()
+            for row in result.data:
+                existing_by_imei[row['imei']] = row
+
+        # Clasificar en memoria (sin I/O): inserts, updates y sin cambios.
+        # Los updates se agrupan por juego de columnas porque PostgREST
+        # exige payloads homogéneos en operaciones masivas (los campos
+        # protegidos hacen variar las columnas entre filas)
+        to_insert = []       # (record, imei)
+        to_update = {}       # tuple(columnas) -> [(filtered_record, audit_kwargs)]
+        unchanged_imeis = []
+
+        # Invariantes del lote fuera del bucle caliente
+        get_existing = existing_by_imei.get
+        sheet_name = drive_sheet_name or 'Sheet1'
+
         for idx, record_data in enumerate(records):
             record = record_data['record']
             imei = record_data['imei']
-            warnings = record_data.get('warnings', [])
-            
+
             # Calcular fila en Drive si hay sync bidireccional
             if drive_file_id:
                 record['drive_file_id'] = drive_file_id
-                record['drive_sheet_name'] = drive_sheet_name or 'Sheet1'
+                record['drive_sheet_name'] = sheet_name
                 record['drive_row_index'] = drive_row_start + idx
-            
+
             try:
-                # Buscar registro existente
-                existing = self.supabase.table('ldu_registros').select('*').eq('imei', imei).execute()
-                
-                if existing.data:
+                existing_record = get_existing(imei)
+
+                if existing_record is not None:
                     # UPDATE - verificar si hay cambios
-                    existing_record = existing.data[0]
-                    
+
                     # Detectar campos editados manualmente
                     manual_fields = self._get_manual_edited_fields(existing_record)
-                    
+
                     # Detectar conflictos con campos manuales
                     conflicts = self._detect_conflicts(
-                        existing_record, 
-                        record, 
+                        existing_record,
+                        record,
                         importacion_id,
                         file_name=file_name or file_id,
                         row_number=record.get('fila_origen')
                     )
-                    
+
                     if conflicts:
                         # Registrar conflictos para resolución posterior
                         self._register_conflicts(conflicts)
                         conflicts_count += len(conflicts)
-                    
+
                     # Filtrar registro para no sobrescribir campos manuales
                     filtered_record = self._filter_record_for_update(record, manual_fields)
-                    
-                    # Comparar campos relevantes (solo los que no están protegidos)
-                    has_changes = self._has_changes(existing_record, filtered_record)
-                    
+
+                    # Hash del registro como quedaría almacenado (los
+                    # campos protegidos conservan su valor actual)
+                    if manual_fields:
+                        new_hash = self._content_hash({**existing_record, **filtered_record})
+                    else:
+                        new_hash = self._content_hash(filtered_record)
+
+                    # Comparar por hash cuando el registro existente ya
+                    # tiene uno; si no, campo a campo como antes
+                    stored_hash = existing_record.get('content_hash')
+                    if stored_hash and not manual_fields:
+                        has_changes = stored_hash != new_hash
+                    else:
+                        has_changes = self._has_changes(existing_record, filtered_record)
+
                     if has_changes:
                         # Guardar estado anterior
                         campos_previos = {
-                            k: existing_record.get(k) 
-                            for k in filtered_record.keys() 
+                            k: existing_record.get(k)
+                            for k in filtered_record.keys()
                             if k in existing_record
                         }
-                        
+
                         # Verificar cambio de responsable (solo si no está protegido)
                         if 'responsable_dni' not in manual_fields:
                             if existing_record.get('responsable_dni') != filtered_record.get('responsable_dni'):
                                 await self._register_responsable_change(
                                     imei=imei,
                                     anterior_dni=existing_record.get('responsable_dni'),
-                                    anterior_nombre=f"{existing_record.get('responsable_nombre', '')} {existing_record.get('responsable_apellido', '')}".strip(),
+                                    anterior_nombre=self._full_name(existing_record),
                                     nuevo_dni=filtered_record.get('responsable_dni'),
-                                    nuevo_nombre=f"{filtered_record.get('responsable_nombre', '')} {filtered_record.get('responsable_apellido', '')}".strip(),
+                                    nuevo_nombre=self._full_name(filtered_record),
                                     motivo='importacion',
                                     user=user,
                                     importacion_id=importacion_id
                                 )
-                        
-                        # Actualizar registro (con campos filtrados)
+
                         filtered_record['presente_en_ultima_importacion'] = True
-                        filtered_record['fecha_ultima_verificacion'] = datetime.now().isoformat()
-                        
-                        self.supabase.table('ldu_registros').update(filtered_record).eq('imei', imei).execute()
-                        
-                        # Registrar auditoría
-                        self._register_audit(
-                            imei=imei,
-                            accion='update',
-                            user=user,
-                            archivo_origen=file_id,
-                            fila_numero=record.get('fila_origen'),
-                            campos_previos=campos_previos,
-                            campos_nuevos=filtered_record,
-                            raw_row=record.get('raw_row'),
-                            importacion_id=importacion_id,
-                            campos_protegidos=manual_fields if manual_fields else None
-                        )
-                        
-                        updated += 1
+                        filtered_record['fecha_ultima_verificacion'] = now_iso
+                        filtered_record['content_hash'] = new_hash
+                        # El upsert masivo necesita la clave de conflicto
+                        filtered_record['imei'] = imei
+
+                        to_update.setdefault(tuple(sorted(filtered_record)), []).append((
+                            filtered_record,
+                            {
+                                'imei': imei,
+                                'accion': 'update',
+                                'user': user,
+                                'archivo_origen': file_id,
+                                'fila_numero': record.get('fila_origen'),
+                                'campos_previos': campos_previos,
+                                'campos_nuevos': filtered_record,
+                                'raw_row': record.get('raw_row'),
+                                'importacion_id': importacion_id,
+                                'campos_protegidos': manual_fields if manual_fields else None
+                            }
+                        ))
                     else:
-                        # Sin cambios, solo actualizar marca de presencia
-                        self.supabase.table('ldu_registros').update({
-                            'presente_en_ultima_importacion': True,
-                            'fecha_ultima_verificacion': datetime.now().isoformat()
-                        }).eq('imei', imei).execute()
-                        
-                        unchanged += 1
+                        unchanged_imeis.append(imei)
                 else:
                     # INSERT
                     record['presente_en_ultima_importacion'] = True
-                    record['fecha_ultima_verificacion'] = datetime.now().isoformat()
-                    record['fecha_registro'] = datetime.now().isoformat()
-                    
-                    self.supabase.table('ldu_registros').insert(record).execute()
-                    
-                    # Registrar auditoría
-                    self._register_audit(
-                        imei=imei,
-                        accion='create',
-                        user=user,
-                        archivo_origen=file_id,
-                        fila_numero=record.get('fila_origen'),
-                        campos_previos=None,
-                        campos_nuevos=record,
-                        raw_row=record.get('raw_row'),
-                        importacion_id=importacion_id
-                    )
-                    
-                    # Si tiene responsable, registrar en catálogo
-                    if record.get('responsable_dni'):
-                        self._ensure_responsable_exists(
-                            dni=record['responsable_dni'],
-                            nombre=record.get('responsable_nombre'),
-                            apellido=record.get('responsable_apellido'),
-                            region=record.get('region')
-                        )
-                    
-                    inserted += 1
-                    
+                    record['fecha_ultima_verificacion'] = now_iso
+                    record['fecha_registro'] = now_iso
+                    record['content_hash'] = self._content_hash(record)
+
+                    to_insert.append((record, imei))
+
             except Exception as e:
                 # Registrar error pero continuar
                 self._register_import_error(
@@ -447,7 +542,112 @@ class LDUSyncService:
                     raw_row=record.get('raw_row'),
                     imei_attempted=imei
                 )
-        
+
+        # Catálogo de DNIs conocidos: un SELECT reemplaza la consulta por
+        # cada responsable de registro nuevo
+        if to_insert:
+            try:
+                resp = self.supabase.table('ldu_responsables').select('dni').execute()
+                self._known_dnis = {r['dni'] for r in resp.data}
+            except Exception as e:
+                # Sin catálogo en memoria se usa el camino por DNI
+                print(f"Error cargando catálogo de responsables: {e}")
+
+        # INSERTs masivos: un upsert por página (idempotente ante carreras)
+        for i in range(0, len(to_insert), self.BULK_CHUNK):
+            chunk = to_insert[i:i + self.BULK_CHUNK]
+            try:
+                await self._upsert_registros_chunk([record for record, _ in chunk])
+            except Exception as e:
+                for record, imei in chunk:
+                    self._register_import_error(
+                        importacion_id=importacion_id,
+                        file_id=file_id,
+                        row_number=record.get('fila_origen'),
+                        error_type='sync_error',
+                        error_message=str(e),
+                        raw_row=record.get('raw_row'),
+                        imei_attempted=imei
+                    )
+                continue
+
+            for record, imei in chunk:
+                # Registrar auditoría
+                self._register_audit(
+                    imei=imei,
+                    accion='create',
+                    user=user,
+                    archivo_origen=file_id,
+                    fila_numero=record.get('fila_origen'),
+                    campos_previos=None,
+                    campos_nuevos=record,
+                    raw_row=record.get('raw_row'),
+                    importacion_id=importacion_id
+                )
+
+                # Si tiene responsable, registrar en catálogo
+                if record.get('responsable_dni'):
+                    self._ensure_responsable_exists(
+                        dni=record['responsable_dni'],
+                        nombre=record.get('responsable_nombre'),
+                        apellido=record.get('responsable_apellido'),
+                        region=record.get('region')
+                    )
+
+            inserted += len(chunk)
+
+        # UPDATEs masivos: upsert por grupo de columnas homogéneo (solo
+        # actualiza las columnas presentes, los campos protegidos quedan
+        # fuera del payload y por lo tanto intactos)
+        for group in to_update.values():
+            for i in range(0, len(group), self.BULK_CHUNK):
+                chunk = group[i:i + self.BULK_CHUNK]
+                try:
+                    await self._upsert_registros_chunk([filtered for filtered, _ in chunk])
+                except Exception as e:
+                    for filtered, audit_kwargs in chunk:
+                        self._register_import_error(
+                            importacion_id=importacion_id,
+                            file_id=file_id,
+                            row_number=audit_kwargs['fila_numero'],
+                            error_type='sync_error',
+                            error_message=str(e),
+                            raw_row=audit_kwargs['raw_row'],
+                            imei_attempted=audit_kwargs['imei']
+                        )
+                    continue
+
+                for _, audit_kwargs in chunk:
+                    self._register_audit(**audit_kwargs)
+
+                updated += len(chunk)
+
+        # Sin cambios: solo refrescar la marca de presencia, en bloque
+        for i in range(0, len(unchanged_imeis), self.BULK_CHUNK):
+            chunk = unchanged_imeis[i:i + self.BULK_CHUNK]
+            try:
+                self.supabase.table('ldu_registros').update({
+                    'presente_en_ultima_importacion': True,
+                    'fecha_ultima_verificacion': now_iso
+                }, returning='minimal').in_('imei', chunk).execute()
+                unchanged += len(chunk)
+            except Exception as e:
+                print(f"Error actualizando marca de presencia: {e}")
+
+        # Alta en bloque de responsables nuevos: upsert ignorando
+        # duplicados por si el SELECT del catálogo vino truncado
+        while self._responsables_buffer:
+            chunk = self._responsables_buffer[:self.BULK_CHUNK]
+            del self._responsables_buffer[:self.BULK_CHUNK]
+            try:
+                self.supabase.table('ldu_responsables').upsert(
+                    chunk, on_conflict='dni', ignore_duplicates=True,
+                    returning='minimal'
+                ).execute()
+            except Exception as e:
+                print(f"Error asegurando responsables: {e}")
+        self._known_dnis = None
+
         return {
             'inserted': inserted,
             'updated': updated,
@@ -455,19 +655,102 @@ class LDUSyncService:
             'conflicts': conflicts_count
         }
     
-    # Campos que se comparan para detectar cambios
-    COMPARE_FIELDS = [
-        'modelo', 'region', 'punto_venta', 'nombre_ruta', 'cobertura_valor',
-        'canal', 'tipo', 'campo_reg', 'campo_ok', 'uso', 'observaciones',
-        'estado', 'responsable_dni', 'responsable_nombre', 'responsable_apellido',
-        'account', 'account_int', 'supervisor', 'zone', 'departamento', 'city'
-    ]
+    def _insert_importacion(self, importacion: Dict[str, Any]) -> None:
+        """Inserta el registro 'en_proceso' (visibilidad; el upsert final manda)"""
+        try:
+            self.supabase.table('ldu_importaciones').insert(
+                importacion, returning='minimal'
+            ).execute()
+        except Exception as e:
+            print(f"Error insertando registro de importación: {e}")
+
+    async def _upsert_registros_chunk(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Upsert de una página homogénea de registros por IMEI
+
+        Si hay pool asyncpg configurado (SUPABASE_DB_URL) la página se
+        escribe con un executemany directo a Postgres; si no, se usa el
+        upsert masivo de PostgREST
+        """
+        pool = await get_pool()
+
+        if pool is None:
+            self.supabase.table('ldu_registros').upsert(
+                rows, on_conflict='imei', returning='minimal'
+            ).execute()
+            return
+
+        cols = list(rows[0])
+        col_list = ', '.join(cols)
+        placeholders = ', '.join(f'${i + 1}' for i in range(len(cols)))
+        updates = ', '.join(f'{c} = EXCLUDED.{c}' for c in cols if c != 'imei')
+        sql = (
+            f'INSERT INTO ldu_registros ({col_list}) VALUES ({placeholders}) '
+            f'ON CONFLICT (imei) DO UPDATE SET {updates}'
+        )
+
+        values = [
+            tuple(self._pg_value(c, row[c]) for c in cols)
+            for row in rows
+        ]
+
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(sql, values)
+
+    @staticmethod
+    def _pg_value(col: str, value: Any) -> Any:
+        """
+        Convierte un valor del payload JSON al tipo que espera asyncpg
+
+        A diferencia de PostgREST, asyncpg no castea: jsonb va como string,
+        TIMESTAMPTZ como datetime y DECIMAL como Decimal
+        """
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        if value is None:
+            return None
+        if col in _PG_TIMESTAMPTZ_COLS and isinstance(value, str):
+            return datetime.fromisoformat(value)
+        if col == 'cobertura_valor' and isinstance(value, float):
+            return Decimal(str(value))
+        return value
+
+    # Tamaño de página para SELECTs .in_() y escrituras masivas a PostgREST
+    BULK_CHUNK = 500
+
+    # Alias de clase para consumidores externos
+    COMPARE_FIELDS = _COMPARE_FIELDS
     
-    def _has_changes(self, existing: Dict, new: Dict) -> bool:
+    @staticmethod
+    def _full_name(row: Dict) -> str:
+        """Nombre completo del responsable de un registro (None cuenta como vacío)"""
+        nombre = row.get('responsable_nombre') or ''
+        apellido = row.get('responsable_apellido') or ''
+        return f"{nombre} {apellido}".strip()
+
+    def _content_hash(self, row: Dict) -> str:
+        """
+        Hash estable del contenido comparable de un registro
+
+        Usa la misma normalización que _has_changes (None y '' equivalen,
+        strip por campo) para que hash igual implique registro sin cambios
+        """
+        h = hashlib.blake2b(digest_size=16)
+        for field in _COMPARE_FIELDS:
+            value = row.get(field)
+            if value is not None:
+                h.update(str(value).strip().encode())
+            h.update(b'|')
+        return h.hexdigest()
+
+    def _has_changes(self, existing: Dict, new: Dict, _fields=_COMPARE_FIELDS) -> bool:
         """Compara si hay cambios significativos entre registros"""
-        for field in self.COMPARE_FIELDS:
-            old_val = existing.get(field)
-            new_val = new.get(field)
+        existing_get = existing.get
+        new_get = new.get
+        for field in _fields:
+            old_val = existing_get(field)
+            new_val = new_get(field)
             
             # Normalizar None y strings vacíos
             if old_val is None:
@@ -511,7 +794,7 @@ class LDUSyncService:
             return conflicts
         
         for field in manual_fields:
-            if field not in self.COMPARE_FIELDS:
+            if field not in _COMPARE_FIELDS_SET:
                 continue
                 
             old_val = existing.get(field) or ''
@@ -539,7 +822,7 @@ class LDUSyncService:
             return 0
         
         try:
-            self.supabase.table('ldu_conflictos').insert(conflicts).execute()
+            self.supabase.table('ldu_conflictos').insert(conflicts, returning='minimal').execute()
             return len(conflicts)
         except Exception as e:
             print(f"Error registrando conflictos: {e}")
@@ -586,42 +869,100 @@ class LDUSyncService:
         if not current_imeis:
             return 0
         
+        # Con pool directo a Postgres el diff completo corre en el
+        # servidor: COPY de los IMEIs actuales a la tabla staging y un
+        # solo UPDATE ... NOT EXISTS, sin bajar la tabla activa a Python
+        pool = await get_pool()
+        if pool is not None:
+            try:
+                async with pool.acquire() as conn:
+                    async with conn.transaction():
+                        await conn.execute('TRUNCATE ldu_staging_imei')
+                        await conn.copy_records_to_table(
+                            'ldu_staging_imei',
+                            records=[(imei,) for imei in set(current_imeis)]
+                        )
+                        rows = await conn.fetch(
+                            """
+                            UPDATE ldu_registros r
+                            SET presente_en_ultima_importacion = false,
+                                fecha_ultima_verificacion = now()
+                            WHERE r.presente_en_ultima_importacion
+                              AND NOT EXISTS (
+                                  SELECT 1 FROM ldu_staging_imei s
+                                  WHERE s.imei = r.imei
+                              )
+                            RETURNING r.imei
+                            """
+                        )
+
+                for row in rows:
+                    self._register_audit(
+                        imei=row['imei'],
+                        accion='no_en_excel',
+                        user=user,
+                        archivo_origen=None,
+                        fila_numero=None,
+                        campos_previos={'presente_en_ultima_importacion': True},
+                        campos_nuevos={'presente_en_ultima_importacion': False},
+                        raw_row=None,
+                        importacion_id=importacion_id,
+                        comentarios='Registro no presente en última importación de Excel'
+                    )
+
+                return len(rows)
+            except Exception as e:
+                # El camino REST de abajo sigue disponible
+                print(f"Error en diff server-side de ausentes: {e}")
+        
         try:
             # Obtener todos los IMEIs que estaban presentes pero ya no están
             all_present = self.supabase.table('ldu_registros').select('imei').eq(
                 'presente_en_ultima_importacion', True
             ).execute()
             
-            present_imeis = {r['imei'] for r in all_present.data}
-            current_set = set(current_imeis)
-            
+            if not all_present.data:
+                return 0
+
+            # Diferencia de conjuntos en numpy: para tablas grandes el
+            # sort/unique en C evita construir dos sets de Python con
+            # hashing por elemento
+            import numpy as np
+            present_arr = np.array([r['imei'] for r in all_present.data])
+            current_arr = np.asarray(current_imeis)
+
             # IMEIs que ya no están en el Excel
-            absent_imeis = present_imeis - current_set
-            
+            absent_imeis = np.setdiff1d(present_arr, current_arr).tolist()
+
+            now_iso = datetime.now().isoformat()
+
+            # Marcar como ausentes en bloque: un UPDATE .in_() por página
+            # en lugar de uno por IMEI
             count = 0
-            for imei in absent_imeis:
-                # Marcar como ausente
+            for i in range(0, len(absent_imeis), self.BULK_CHUNK):
+                chunk = absent_imeis[i:i + self.BULK_CHUNK]
                 self.supabase.table('ldu_registros').update({
                     'presente_en_ultima_importacion': False,
-                    'fecha_ultima_verificacion': datetime.now().isoformat()
-                }).eq('imei', imei).execute()
-                
-                # Registrar auditoría
-                self._register_audit(
-                    imei=imei,
-                    accion='no_en_excel',
-                    user=user,
-                    archivo_origen=None,
-                    fila_numero=None,
-                    campos_previos={'presente_en_ultima_importacion': True},
-                    campos_nuevos={'presente_en_ultima_importacion': False},
-                    raw_row=None,
-                    importacion_id=importacion_id,
-                    comentarios='Registro no presente en última importación de Excel'
-                )
-                
-                count += 1
-            
+                    'fecha_ultima_verificacion': now_iso
+                }, returning='minimal').in_('imei', chunk).execute()
+
+                # Registrar auditoría (encolada, se inserta al hacer flush)
+                for imei in chunk:
+                    self._register_audit(
+                        imei=imei,
+                        accion='no_en_excel',
+                        user=user,
+                        archivo_origen=None,
+                        fila_numero=None,
+                        campos_previos={'presente_en_ultima_importacion': True},
+                        campos_nuevos={'presente_en_ultima_importacion': False},
+                        raw_row=None,
+                        importacion_id=importacion_id,
+                        comentarios='Registro no presente en última importación de Excel'
+                    )
+
+                count += len(chunk)
+
             return count
             
         except Exception as e:
@@ -640,9 +981,9 @@ class LDUSyncService:
         importacion_id: Optional[str] = None,
         comentarios: Optional[str] = None
     ):
-        """Registra cambio de responsable en historial"""
+        """Encola un cambio de responsable para el historial"""
         try:
-            self.supabase.table('ldu_historial_responsables').insert({
+            self._historial_buffer.append({
                 'ldu_imei': imei,
                 'responsable_anterior_dni': anterior_dni,
                 'responsable_anterior_nombre': anterior_nombre,
@@ -652,7 +993,7 @@ class LDUSyncService:
                 'comentarios': comentarios,
                 'usuario_cambio': user,
                 'importacion_id': importacion_id
-            }).execute()
+            })
         except Exception as e:
             print(f"Error registrando cambio de responsable: {e}")
     
@@ -670,7 +1011,7 @@ class LDUSyncService:
         comentarios: Optional[str] = None,
         campos_protegidos: Optional[List[str]] = None
     ):
-        """Registra evento de auditoría"""
+        """Encola un evento de auditoría (se inserta en bloque al hacer flush)"""
         try:
             # Limpiar raw_row para JSON
             if raw_row:
@@ -685,7 +1026,7 @@ class LDUSyncService:
                 protegidos_info = f"Campos protegidos (no actualizados): {', '.join(campos_protegidos)}"
                 comentarios = f"{comentarios}. {protegidos_info}" if comentarios else protegidos_info
             
-            self.supabase.table('ldu_auditoria').insert({
+            self._audit_buffer.append({
                 'imei': imei,
                 'accion': accion,
                 'usuario_sistema': user,
@@ -698,7 +1039,7 @@ class LDUSyncService:
                 'importacion_id': importacion_id,
                 'comentarios': comentarios,
                 'operacion_id': str(uuid.uuid4())
-            }).execute()
+            })
         except Exception as e:
             print(f"Error registrando auditoría: {e}")
     
@@ -712,12 +1053,12 @@ class LDUSyncService:
         raw_row: Optional[Dict],
         imei_attempted: Optional[str]
     ):
-        """Registra error de importación"""
+        """Encola un error de importación (se inserta en bloque al hacer flush)"""
         try:
             if raw_row:
                 raw_row = self._clean_for_json(raw_row)
             
-            self.supabase.table('ldu_import_errors').insert({
+            self._error_buffer.append({
                 'importacion_id': importacion_id,
                 'archivo_id': file_id,
                 'fila_numero': row_number,
@@ -725,10 +1066,41 @@ class LDUSyncService:
                 'mensaje_error': error_message,
                 'raw_row': raw_row,
                 'imei_intentado': imei_attempted
-            }).execute()
+            })
         except Exception as e:
             print(f"Error registrando error de importación: {e}")
     
+    def _flush_table_buffer(self, table: str, buffer: List[Dict]) -> None:
+        """Inserta en bloque (paginado) el contenido de un buffer y lo vacía"""
+        while buffer:
+            chunk = buffer[:self.BULK_CHUNK]
+            del buffer[:self.BULK_CHUNK]
+            try:
+                self.supabase.table(table).insert(chunk, returning='minimal').execute()
+            except Exception as e:
+                print(f"Error insertando en {table}: {e}")
+
+    async def _flush_buffers(self) -> None:
+        """
+        Escribe todos los buffers pendientes (auditoría, historial, errores)
+
+        Las tres tablas son independientes y sin orden relativo, así que
+        sus escrituras se solapan con gather + to_thread en lugar de
+        pagar las latencias en serie (cada flush traga sus propios
+        errores, gather no se corta a medias)
+        """
+        await asyncio.gather(
+            asyncio.to_thread(
+                self._flush_table_buffer, 'ldu_auditoria', self._audit_buffer
+            ),
+            asyncio.to_thread(
+                self._flush_table_buffer, 'ldu_historial_responsables', self._historial_buffer
+            ),
+            asyncio.to_thread(
+                self._flush_table_buffer, 'ldu_import_errors', self._error_buffer
+            )
+        )
+
     def _ensure_responsable_exists(
         self,
         dni: str,
@@ -738,6 +1110,22 @@ class LDUSyncService:
     ):
         """Asegura que el responsable exista en el catálogo"""
         try:
+            if self._known_dnis is not None:
+                # Dentro de una sincronización: membership en memoria y
+                # alta encolada, sin SELECT por registro
+                if dni in self._known_dnis:
+                    return
+                self._known_dnis.add(dni)
+                self._responsables_buffer.append({
+                    'dni': dni,
+                    'nombre': nombre,
+                    'apellido': apellido,
+                    'nombre_completo': f"{nombre or ''} {apellido or ''}".strip(),
+                    'region': region,
+                    'estado': 'activo'
+                })
+                return
+            
             existing = self.supabase.table('ldu_responsables').select('dni').eq('dni', dni).execute()
             
             if not existing.data:
@@ -750,12 +1138,18 @@ class LDUSyncService:
                     'nombre_completo': nombre_completo,
                     'region': region,
                     'estado': 'activo'
-                }).execute()
+                }, returning='minimal').execute()
         except Exception as e:
             print(f"Error asegurando responsable: {e}")
     
     def _clean_for_json(self, data: Dict) -> Dict:
         """Limpia un diccionario para ser serializable a JSON"""
+        if orjson is not None:
+            # Un dumps/loads en C reemplaza la recursión en Python:
+            # datetime sale como isoformat nativo y cualquier otro tipo
+            # no-JSON cae a str(), igual que el camino manual
+            return orjson.loads(orjson.dumps(data, default=str))
+        
         cleaned = {}
         for key, value in data.items():
             if value is None:
@@ -796,7 +1190,11 @@ class LDUSyncService:
             Dict con registros y metadata de paginación
         """
         try:
-            q = self.supabase.table('ldu_registros').select('*', count='exact')
+            # count='planned': el total sale del plan de la consulta en
+            # lugar de un COUNT(*) aparte con los mismos ILIKE (que en
+            # tablas grandes es otro scan completo). Para paginar una UI
+            # el estimado es suficiente
+            q = self.supabase.table('ldu_registros').select('*', count='planned')
             
             # Aplicar filtros
             if imei:
@@ -878,6 +1276,19 @@ class LDUSyncService:
     
     def get_stats(self) -> Dict[str, Any]:
         """Obtiene estadísticas generales de LDU"""
+        # Un solo RPC agrega los tres contadores en una pasada del
+        # servidor (ver migración add_ldu_stats_full_rpc.sql)
+        try:
+            result = self.supabase.rpc('ldu_stats_full').execute()
+            if result.data:
+                data = result.data
+                if isinstance(data, list):
+                    data = data[0]
+                return data
+        except Exception as e:
+            # Sin la función desplegada se usan los conteos clásicos
+            print(f"RPC ldu_stats_full no disponible: {e}")
+        
         try:
             # Total registros
             total = self.supabase.table('ldu_registros').select('id', count='exact').eq('activo', True).execute()
@@ -940,7 +1351,7 @@ class LDUSyncService:
             
             # Guardar datos anteriores
             anterior_dni = current.get('responsable_dni')
-            anterior_nombre = f"{current.get('responsable_nombre', '')} {current.get('responsable_apellido', '')}".strip()
+            anterior_nombre = self._full_name(current)
             
             # Actualizar registro
             nuevo_nombre_completo = f"{nuevo_nombre} {nuevo_apellido}".strip()
@@ -949,7 +1360,7 @@ class LDUSyncService:
                 'responsable_dni': nuevo_dni,
                 'responsable_nombre': nuevo_nombre,
                 'responsable_apellido': nuevo_apellido
-            }).eq('imei', imei).execute()
+            }, returning='minimal').eq('imei', imei).execute()
             
             # Registrar cambio de responsable
             await self._register_responsable_change(
@@ -992,6 +1403,9 @@ class LDUSyncService:
                 region=current.get('region')
             )
             
+            # Fuera de una importación no hay más eventos que acumular
+            await self._flush_buffers()
+            
             return {
                 'success': True,
                 'imei': imei,
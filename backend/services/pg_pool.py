@@ -0,0 +1,50 @@
+"""
+Pool opcional de conexiones directas a Postgres (asyncpg)
+
+Las rutas calientes de escritura pueden saltarse PostgREST y hablar con
+la base de Supabase directamente si se configura SUPABASE_DB_URL (el
+connection string de Postgres del proyecto). Si no hay DSN o asyncpg no
+está instalado, get_pool() devuelve None y los servicios siguen usando
+el cliente REST.
+"""
+import asyncio
+
+from config.settings import SUPABASE_DB_URL
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+_pool = None
+_pool_lock = asyncio.Lock()
+
+
+async def get_pool():
+    """Devuelve el pool asyncpg, o None si no está configurado/instalado"""
+    global _pool
+    if asyncpg is None or not SUPABASE_DB_URL:
+        return None
+
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                # statement_cache_size=0 es obligatorio detrás del pooler
+                # de Supabase (pgbouncer en modo transacción no soporta
+                # prepared statements con nombre)
+                _pool = await asyncpg.create_pool(
+                    SUPABASE_DB_URL,
+                    min_size=5,
+                    max_size=20,
+                    statement_cache_size=0
+                )
+
+    return _pool
+
+
+async def close_pool():
+    """Cierra el pool si fue creado (para apagado ordenado)"""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
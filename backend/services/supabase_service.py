@@ -2,6 +2,7 @@
 Servicio de conexión y operaciones con Supabase.
 Maneja almacenamiento de documentos y consultas.
 """
+import functools
 import logging
 from typing import Dict, List, Optional
 from datetime import datetime
@@ -244,8 +245,13 @@ class SupabaseService:
             return False
 
 
+@functools.lru_cache(maxsize=1)
 def get_supabase_service() -> SupabaseService:
-    """Factory para obtener servicio de Supabase."""
+    """
+    Factory para obtener servicio de Supabase.
+    Singleton por proceso: create_client se ejecuta una sola vez,
+    por lo que scripts y API reutilizan la misma conexión HTTP.
+    """
     return SupabaseService()
 
 
@@ -319,5 +325,5 @@ CREATE POLICY "Permitir escritura desde servicio" ON documentos_guia
     FOR ALL USING (true);
 """
 
-# Crear instancia singleton del servicio
-supabase_service = SupabaseService()
+# Crear instancia singleton del servicio (misma instancia que get_supabase_service)
+supabase_service = get_supabase_service()